@@ -1,39 +1,161 @@
 import os
+import html
 import json
+import time
 import uuid
+import threading
+import importlib
 from flask import (
     Flask, render_template, request, jsonify, redirect, 
-    url_for, session, flash, send_from_directory,
-    Response
+    url_for, session, flash,
+    send_file, Response, stream_with_context, g
 )
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-from weasyprint import HTML
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-# --- Vertex AI Imports ---
-import vertexai
-from vertexai.generative_models import GenerativeModel, GenerationConfig
+from jobs import JobQueue, ACTIVE_STATES, SUCCEEDED
+from resume_cache import ResumeCache, make_cache_key
+from resume_index import ResumeIndex
+from zip_export import StreamingZip
+from html_assets import HtmlAssets, write_html, discard_variants, VARIANT_SUFFIXES
+from jd_similarity import JobDescriptionIndex
+from llm_client import LLMClient, RateLimiter, CircuitBreaker, MemoryBucketState, SQLiteBucketState, ModelUnavailableError
+from resume_sections import (RESUME_SECTIONS, find_section, section_heading, clean_section_fragment, splice_section,
+                             replace_in_section)
+from pdf_renderer import PdfRenderer
+from profile_store import ProfileStore, DEFAULT_PROFILE, ITEM_SECTIONS
+from storage import create_storage
+from file_lock import lock_for, remove_lock_file
+from prompt_compaction import compact_profile, compact_json, estimate_tokens
+from metrics import Registry, start_spans, collected_spans, timed_stage, record_stage
 
 # --- Configuration ---
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'a-very-secret-random-key-please-change-me' 
 PROFILE_DIR = "profiles"
+PROFILE_COMPACT_AFTER = int(os.environ.get("PROFILE_COMPACT_AFTER", "100"))  # Journaled edits before compaction
 PASSWORD_FILE = "passwords.json"
 RESUME_DIR = "resumes"
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")  # "json" or "sqlite"
+STORAGE_DB = os.environ.get("STORAGE_DB", "resume_hacker.db")
+RESUME_TEMPLATE_FILE = os.path.join("templates", "resume_template.html")
+GENERATION_WORKERS = int(os.environ.get("GENERATION_WORKERS", "4"))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))  # Max parallel AI calls per batch
+BATCH_MAX_ITEMS = 50
+RESUME_CACHE_DIR = os.path.join("cache", "resumes")
+RESUME_CACHE_MEMORY_ENTRIES = int(os.environ.get("RESUME_CACHE_MEMORY_ENTRIES", "64"))
+RESUME_CACHE_MAX_BYTES = int(os.environ.get("RESUME_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+PDF_RENDER_WORKERS = int(os.environ.get("PDF_RENDER_WORKERS", str(os.cpu_count() or 2)))
+PDF_RENDER_TIMEOUT = 60  # Seconds a download waits for its PDF
+EXPORT_MAX_IN_FLIGHT = int(os.environ.get("EXPORT_MAX_IN_FLIGHT", str(2 * PDF_RENDER_WORKERS)))  # PDF renders queued per export
+GENERATION_MODE = os.environ.get("GENERATION_MODE", "html")  # "html": model writes the page, "slots": model returns JSON we render
+SLOTS_TEMPLATE = "resume_slots.html"
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "3000"))  # Max profile tokens per prompt, 0 = no limit
+RESUMES_PER_PAGE = 20
+RESUMES_MAX_PER_PAGE = 100
+DUPLICATE_JD_THRESHOLD = float(os.environ.get("DUPLICATE_JD_THRESHOLD", "0.75"))  # Offer reuse above this similarity, 0 = off
+PRERENDER_PDFS = os.environ.get("PRERENDER_PDFS", "0") == "1"  # Render PDFs as soon as a resume is generated
+TIMING_HEADER = os.environ.get("TIMING_HEADER", "0") == "1"  # Add a Server-Timing header with per-stage timings
+MODEL_FACTORY = os.environ.get("MODEL_FACTORY", "")  # "module:callable" returning a model, e.g. a local stand-in
+WARMUP_ON_START = os.environ.get("WARMUP_ON_START", "0") == "1"  # Create the model and PDF workers in the background
+MODEL_REQUESTS_PER_MINUTE = int(os.environ.get("MODEL_REQUESTS_PER_MINUTE", "0"))  # Client-side quota, 0 = no limit
+MODEL_TOKENS_PER_MINUTE = int(os.environ.get("MODEL_TOKENS_PER_MINUTE", "0"))  # Estimated prompt tokens, 0 = no limit
+MODEL_LIMITER_DB = os.environ.get("MODEL_LIMITER_DB", "")  # SQLite file to share the quota between worker processes
+MODEL_TIMEOUT = float(os.environ.get("MODEL_TIMEOUT", "120"))  # Seconds per model call (to the first chunk when streaming)
+MODEL_MAX_RETRIES = int(os.environ.get("MODEL_MAX_RETRIES", "3"))
+MODEL_MAX_QUEUE_SECONDS = float(os.environ.get("MODEL_MAX_QUEUE_SECONDS", "60"))  # Fail fast instead of queueing longer
+MODEL_BREAKER_FAILURES = int(os.environ.get("MODEL_BREAKER_FAILURES", "5"))  # Consecutive failures that open the circuit
+MODEL_BREAKER_RESET = float(os.environ.get("MODEL_BREAKER_RESET", "30"))  # Seconds before a trial call is let through
 
 # --- Vertex AI Setup ---
 # !!! REPLACE WITH YOUR PROJECT DETAILS !!!
 YOUR_PROJECT_ID = "johanesa-playground-326616"
 YOUR_LOCATION = "us-central1"  # e.g., "us-central1"
 
-vertexai.init(project=YOUR_PROJECT_ID, location=YOUR_LOCATION)
+MODEL_NAME = "gemini-2.5-flash-lite"
+GENERATION_SETTINGS = {
+    "temperature": 0.2,
+    "max_output_tokens": 8192
+}
+SLOTS_GENERATION_SETTINGS = dict(GENERATION_SETTINGS, response_mime_type="application/json")
+# generate_content() accepts the settings dicts directly as its generation_config
+generation_config = GENERATION_SETTINGS
+slots_generation_config = SLOTS_GENERATION_SETTINGS
 
-model = GenerativeModel("gemini-2.5-flash-lite")
-generation_config = GenerationConfig(
-    temperature=0.2,
-    max_output_tokens=8192
-)
+# The SDK import and vertexai.init() take seconds, so the model is created on
+# first use (or by the warm-up thread) instead of at import time.
+def create_vertex_model():
+    import vertexai
+    from vertexai.generative_models import GenerativeModel
+    vertexai.init(project=YOUR_PROJECT_ID, location=YOUR_LOCATION)
+    return GenerativeModel(MODEL_NAME)
+
+def load_model_factory(spec):
+    """Resolves a "module:callable" MODEL_FACTORY setting."""
+    module_name, _, attr = spec.partition(":")
+    if not module_name or not attr:
+        raise ValueError(f"MODEL_FACTORY must look like 'module:callable', got {spec!r}")
+    return getattr(importlib.import_module(module_name), attr)
+
+_model = None
+_model_factory = load_model_factory(MODEL_FACTORY) if MODEL_FACTORY else create_vertex_model
+_model_lock = threading.Lock()
+
+def set_model_factory(factory):
+    """Replaces the function that creates the model; the next get_model() call uses it."""
+    global _model, _model_factory
+    with _model_lock:
+        _model_factory = factory
+        _model = None
+
+def get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = _model_factory()
+    return _model
+
+# All model calls go through this client: it waits for the shared request and
+# token buckets, times out slow calls, retries 429s and transient errors with
+# jittered backoff and fails fast while the circuit breaker is open.
+llm_client = LLMClient(
+    get_model,
+    limiter=RateLimiter(SQLiteBucketState(MODEL_LIMITER_DB) if MODEL_LIMITER_DB else MemoryBucketState(),
+                        requests_per_minute=MODEL_REQUESTS_PER_MINUTE,
+                        tokens_per_minute=MODEL_TOKENS_PER_MINUTE),
+    breaker=CircuitBreaker(failure_threshold=MODEL_BREAKER_FAILURES, reset_timeout=MODEL_BREAKER_RESET),
+    timeout=MODEL_TIMEOUT,
+    max_retries=MODEL_MAX_RETRIES,
+    max_queue_seconds=MODEL_MAX_QUEUE_SECONDS)
+
+# --- Metrics (exposed at /metrics) ---
+metrics_registry = Registry()
+STAGE_SECONDS = metrics_registry.histogram(
+    "resume_stage_seconds", "Time spent in each stage of resume generation and PDF download.",
+    ("pipeline", "stage"))
+HTTP_REQUEST_SECONDS = metrics_registry.histogram(
+    "http_request_duration_seconds", "Request handling time per endpoint.", ("endpoint", "method", "status"))
+MODEL_CALLS = metrics_registry.counter(
+    "resume_model_calls_total", "Vertex AI calls by mode and outcome.", ("mode", "outcome"))
+MODEL_CHARS = metrics_registry.counter(
+    "resume_model_chars_total", "Characters sent to and received from Vertex AI.", ("direction",))
+MODEL_TOKENS = metrics_registry.counter(
+    "resume_model_tokens_total", "Tokens sent to and received from Vertex AI (estimated when the "
+    "response has no usage metadata).", ("direction",))
+GENERATIONS_IN_FLIGHT = metrics_registry.gauge(
+    "resume_generations_in_flight", "Vertex AI calls currently running.", ("mode",))
+DUPLICATE_CHECKS = metrics_registry.counter(
+    "resume_duplicate_checks_total", "Job descriptions checked against earlier ones, by result.", ("result",))
+DUPLICATE_DECISIONS = metrics_registry.counter(
+    "resume_duplicate_decisions_total", "What users chose when offered an earlier resume.", ("action",))
+MODEL_SECONDS_SAVED = metrics_registry.counter(
+    "resume_model_seconds_saved_total", "Estimated model time saved by reusing earlier resumes "
+    "(average model call duration per reuse).")
+PROFILE_TOKENS = metrics_registry.counter(
+    "resume_profile_tokens_total", "Profile tokens before and after prompt compaction.", ("stage",))
 
 # --- MODIFIED: Default AI Prompt is now a non-editable base ---
 DEFAULT_AI_PROMPT = """You are a silent, expert HTML resume generator. Your *only* output must be a single, complete HTML file.
@@ -69,79 +191,66 @@ Your response MUST be *only* the raw HTML code.
 - Your entire response MUST start with `<!DOCTYPE html>` and end with `</html>`.
 """
 
-# --- MODIFIED: Default Profile Structure ---
-DEFAULT_PARTICULARS = {
-    "name": "", "email": "", "languages": [], "country": ""
-}
-DEFAULT_PROFILE = {
-    "particulars": DEFAULT_PARTICULARS.copy(),
-    "experiences": [], "education": [], "projects": [], "awards": [],
-    "ai_custom_prompt": ""  # NEW: For user's custom instructions
-}
+# --- Structured-slot prompt: the model returns only the tailored text, we render the page ---
+SLOTS_AI_PROMPT = """You are a silent, expert resume writer. Your *only* output must be a single JSON object.
+You will be given three inputs: a candidate's profile, a job application, and custom user instructions.
 
-# --- (Password Load/Save unchanged) ---
-def load_passwords():
-    if not os.path.exists(PASSWORD_FILE): return {}
-    try:
-        with open(PASSWORD_FILE, 'r', encoding='utf-8') as f: return json.load(f)
-    except (json.JSONDecodeError, IOError): return {}
-def save_passwords(passwords):
-    with open(PASSWORD_FILE, 'w', encoding='utf-8') as f: json.dump(passwords, f, indent=4)
+**Your Task:**
+1.  **SUMMARY:** Write a new, compelling "Professional Summary" (3-5 sentences), hyper-specific to the **{job_title}** role at **{company_name}**, using keywords from the job description.
+2.  **TAILOR CONTENT:** For every experience and project in the profile, rewrite its description as concise bullet points (one per line, starting with "• ") using action verbs and keywords from the job description where relevant.
+3.  **FOLLOW CUSTOM INSTRUCTIONS:** You *must* obey all additional rules from the user, found here: {custom_instructions}
 
-# --- MODIFIED: load_profile_data ---
-def load_profile_data(profile_name):
-    new_profile_data = DEFAULT_PROFILE.copy()
-    new_profile_data['particulars'] = DEFAULT_PARTICULARS.copy()
+**Inputs:**
 
-    if not os.path.exists(PROFILE_DIR): os.makedirs(PROFILE_DIR)
-    if ".." in profile_name or "/" in profile_name or "\\" in profile_name:
-         return new_profile_data
-    filepath = os.path.join(PROFILE_DIR, f"{profile_name}.json")
-    if not os.path.exists(filepath): return new_profile_data
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            if isinstance(data, list):
-                new_profile_data['experiences'] = data
-                return new_profile_data
-            elif isinstance(data, dict):
-                new_profile_data.update(data)
-                if 'particulars' not in data:
-                    new_profile_data['particulars'] = DEFAULT_PARTICULARS.copy()
-                else:
-                    default_particulars_copy = DEFAULT_PARTICULARS.copy()
-                    default_particulars_copy.update(data['particulars'])
-                    new_profile_data['particulars'] = default_particulars_copy
-                
-                # NEW: Ensure ai_custom_prompt exists
-                if 'ai_custom_prompt' not in data:
-                     new_profile_data['ai_custom_prompt'] = ""
-
-                return new_profile_data
-            else: return new_profile_data
-    except (json.JSONDecodeError, IOError): return new_profile_data
-
-# --- MODIFIED: save_profile_data ---
-def save_profile_data(profile_name, profile_data):
-    if not os.path.exists(PROFILE_DIR): os.makedirs(PROFILE_DIR)
-    if ".." in profile_name or "/" in profile_name or "\\" in profile_name:
-         raise ValueError("Invalid profile name")
-    filepath = os.path.join(PROFILE_DIR, f"{profile_name}.json")
-    with open(filepath, 'w', encoding='utf-8') as f:
-        if isinstance(profile_data, dict):
-            full_data = DEFAULT_PROFILE.copy()
-            full_data['particulars'] = DEFAULT_PARTICULARS.copy()
-            full_data.update(profile_data)
-            
-            if 'particulars' in profile_data:
-                full_data['particulars'] = DEFAULT_PARTICULARS.copy()
-                full_data['particulars'].update(profile_data['particulars'])
-            
-            # Ensure ai_custom_prompt is saved
-            full_data['ai_custom_prompt'] = profile_data.get('ai_custom_prompt', "")
+---
+**1. PROFILE_DATA:**
+{profile_json}
+---
+**2. JOB_APPLICATION:**
+* Company Name: {company_name}
+* Job Title: {job_title}
+* Job Description: {job_description}
+---
+
+**Output Format Rules (Most Important):**
+Respond with JSON only, exactly in this shape, using the "id" values from PROFILE_DATA as keys:
+{{"summary": "...", "experiences": {{"<experience id>": "tailored description"}}, "projects": {{"<project id>": "tailored description"}}}}
+"""
 
-            json.dump(full_data, f, indent=4)
-        else: json.dump(DEFAULT_PROFILE, f, indent=4)
+# --- Section prompt: regenerate one <section> of an existing resume ---
+SECTION_AI_PROMPT = """You are a silent, expert HTML resume editor. Your *only* output must be a single HTML `<section>` element.
+You will be given the current "{section_heading}" section of a candidate's resume, the profile data for it, a job application, and custom user instructions.
+
+**Your Task:**
+1.  **REWRITE THE SECTION:** Write a new version of the "{section_heading}" section tailored to the **{job_title}** role at **{company_name}**, using action verbs and keywords from the job description where relevant. A "Professional Summary" must be 3-5 sentences.
+2.  **KEEP THE STRUCTURE:** Use exactly the same HTML tags, class names and heading as CURRENT_SECTION. Only use facts from PROFILE_DATA.
+3.  **FOLLOW CUSTOM INSTRUCTIONS:** You *must* obey all additional rules from the user, found here: {custom_instructions}
+
+**Inputs:**
+
+---
+**1. CURRENT_SECTION:**
+{current_section}
+---
+**2. PROFILE_DATA:**
+{profile_json}
+---
+**3. JOB_APPLICATION:**
+* Company Name: {company_name}
+* Job Title: {job_title}
+* Job Description: {job_description}
+---
+
+**Output Format Rules (Most Important):**
+Your response MUST be *only* the raw HTML of the new section: it starts with `<section class="section">` and ends with `</section>`.
+Do not write any other text, markdown, CSS or the rest of the document.
+"""
+
+# --- Storage Backend ---
+storage = create_storage(STORAGE_BACKEND, PASSWORD_FILE, PROFILE_DIR, RESUME_DIR, STORAGE_DB)
+
+# --- Profile Repository ---
+profile_store = ProfileStore(storage, compact_after=PROFILE_COMPACT_AFTER)
 
 # --- (Auth Routes & Main Page Route are unchanged) ---
 @app.route('/login', methods=['GET', 'POST'])
@@ -152,9 +261,9 @@ def login():
         if not profile_name or not password:
             flash('Please enter a profile name and password.', 'error')
             return redirect(url_for('login'))
-        passwords = load_passwords()
-        if profile_name in passwords:
-            if check_password_hash(passwords[profile_name], password):
+        password_hash = storage.get_password_hash(profile_name)
+        if password_hash is not None:
+            if check_password_hash(password_hash, password):
                 session['profile_name'] = profile_name
                 flash(f'Welcome back, {profile_name}!', 'success')
                 return redirect(url_for('index'))
@@ -163,9 +272,10 @@ def login():
                 return redirect(url_for('login'))
         else:
             hashed_password = generate_password_hash(password)
-            passwords[profile_name] = hashed_password
-            save_passwords(passwords)
-            save_profile_data(profile_name, DEFAULT_PROFILE.copy()) # Will save default prompt
+            if not storage.create_user(profile_name, hashed_password):  # Someone signed up with it just now
+                flash(f'Profile "{profile_name}" already exists. Please log in.', 'error')
+                return redirect(url_for('login'))
+            profile_store.save(profile_name, DEFAULT_PROFILE) # Will save default prompt
             session['profile_name'] = profile_name
             flash(f'New profile "{profile_name}" created. Welcome!', 'success')
             return redirect(url_for('index'))
@@ -182,27 +292,558 @@ def index():
     if 'profile_name' not in session:
         return redirect(url_for('login'))
     profile_name = session['profile_name']
-    profile_data = load_profile_data(profile_name)
+    profile_data = profile_store.load(profile_name)
     return render_template('index.html', 
                            profile_name=profile_name, 
                            profile_data=profile_data)
 
-# --- Resume Metadata Functions (unchanged) ---
-def get_user_resume_dir():
-    if 'profile_name' not in session: return None
-    profile_folder = secure_filename(session['profile_name'])
+# --- Resume Metadata Functions ---
+def get_profile_resume_dir(profile_name):
+    profile_folder = secure_filename(profile_name)
     profile_resume_dir = os.path.join(RESUME_DIR, profile_folder)
-    if not os.path.exists(profile_resume_dir): os.makedirs(profile_resume_dir)
+    if not os.path.exists(profile_resume_dir): os.makedirs(profile_resume_dir, exist_ok=True)
     return profile_resume_dir
-def load_resume_metadata(profile_resume_dir):
-    metadata_path = os.path.join(profile_resume_dir, 'resumes.json')
-    if not os.path.exists(metadata_path): return []
+def get_user_resume_dir():
+    if 'profile_name' not in session: return None
+    return get_profile_resume_dir(session['profile_name'])
+def load_resume_metadata(profile_name):
+    return storage.load_resume_metadata(secure_filename(profile_name))
+def append_resume_metadata(profile_name, new_entries):
+    storage.add_resume_metadata(secure_filename(profile_name), new_entries)
+def delete_resume_metadata(profile_name, resume_id):
+    return storage.delete_resume_metadata(secure_filename(profile_name), resume_id)
+def find_resume_entry(profile_name, resume_id):
+    return next((e for e in load_resume_metadata(profile_name) if e.get('id') == resume_id), None)
+def is_saved_resume(profile_name, filename):
+    """True for a resume page listed in the user's metadata, never resumes.json, jobs.json or a cached PDF."""
+    return filename.endswith('.html') and any(e.get('filename') == filename
+                                              for e in load_resume_metadata(profile_name))
+
+resume_index = ResumeIndex(storage, RESUME_DIR)
+html_assets = HtmlAssets()
+jd_index = JobDescriptionIndex(storage)
+
+def find_similar_resume(profile_name, job_description):
+    """Returns (metadata entry, similarity) of an earlier resume generated for a
+    near-identical job description, or (None, None)."""
+    if DUPLICATE_JD_THRESHOLD <= 0: return None, None
+    profile_folder = secure_filename(profile_name)
+    resume_id, similarity = jd_index.find_similar(profile_folder, job_description, DUPLICATE_JD_THRESHOLD)
+    entry = None
+    if resume_id is not None:
+        entry = next((e for e in load_resume_metadata(profile_name) if e.get('id') == resume_id), None)
+    DUPLICATE_CHECKS.inc(result="hit" if entry else "miss")
+    return entry, similarity
+
+def query_resumes(profile_name, args):
+    """Runs a resume index query from request args (q, company, role, page, per_page)."""
+    try:
+        page = int(args.get('page', 1))
+        per_page = min(max(int(args.get('per_page', RESUMES_PER_PAGE)), 1), RESUMES_MAX_PER_PAGE)
+    except ValueError:
+        page, per_page = 1, RESUMES_PER_PAGE
+    return resume_index.query(secure_filename(profile_name), text=args.get('q', ''),
+                              company=args.get('company', ''), role=args.get('role', ''),
+                              page=page, per_page=per_page)
+
+# --- Background Resume Generation ---
+job_queue = JobQueue(max_workers=GENERATION_WORKERS)
+
+def build_resume_filename(profile_name, job_title, company_name, now, suffix=""):
+    """The timestamp only has one-second precision and queued jobs for the same
+    job can run in the same second, so a random fragment keeps names unique."""
+    datetime_str = now.strftime("%Y%m%d%H%M%S")
+    safe_profile = secure_filename(profile_name)
+    safe_job = secure_filename(job_title)
+    safe_company = secure_filename(company_name)
+    if not safe_job: safe_job = "job"
+    if not safe_company: safe_company = "company"
+    return f"{safe_profile}_{datetime_str}_{safe_job}_{safe_company}{suffix}_{uuid.uuid4().hex[:8]}.html"
+
+def load_resume_template():
+    try:
+        with open(RESUME_TEMPLATE_FILE, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        raise Exception("ERROR: resume_template.html not found.")
+
+def log_compaction(compaction_stats, company_name, job_title):
+    PROFILE_TOKENS.inc(compaction_stats['tokens_before'], stage="before")
+    PROFILE_TOKENS.inc(compaction_stats['tokens_after'], stage="after")
+    print(f"Prompt compaction for {job_title} at {company_name}: "
+          f"{compaction_stats['tokens_before']} -> {compaction_stats['tokens_after']} profile tokens, "
+          f"{compaction_stats['items_kept']}/{compaction_stats['items_total']} items kept")
+
+def build_resume_prompt(profile_data, template_example, company_name, job_title, job_description):
+    """Returns (prompt, compaction stats). Only the profile items most relevant
+    to the job are sent, within PROMPT_TOKEN_BUDGET."""
+    compacted_profile, compaction_stats = compact_profile(profile_data, job_title, job_description,
+                                                          PROMPT_TOKEN_BUDGET)
+    log_compaction(compaction_stats, company_name, job_title)
+    # Create context dictionary to format the prompt
+    prompt_context = {
+        "profile_json": compact_json(compacted_profile),
+        "job_title": job_title,
+        "company_name": company_name,
+        "job_description": job_description,
+        "template_example": template_example,
+        "custom_instructions": profile_data.get('ai_custom_prompt', "")  # Inject custom instructions
+    }
+    try:
+        return DEFAULT_AI_PROMPT.format_map(prompt_context), compaction_stats
+    except KeyError as e:
+        # This catches if the main prompt has a missing variable (our error)
+        print(f"Prompt formatting error: {e}")
+        raise Exception(f'Critical prompt error: Missing variable {e}.')
+
+pdf_renderer = PdfRenderer(max_workers=PDF_RENDER_WORKERS, timeout=PDF_RENDER_TIMEOUT)
+
+resume_cache = ResumeCache(RESUME_CACHE_DIR,
+                           max_memory_entries=RESUME_CACHE_MEMORY_ENTRIES,
+                           max_disk_bytes=RESUME_CACHE_MAX_BYTES)
+
+def record_model_usage(prompt, response_text, usage=None):
+    """Counts characters and tokens of one model call. Token counts come from the
+    response's usage metadata when the SDK provides it, otherwise they are estimated."""
+    MODEL_CHARS.inc(len(prompt), direction="prompt")
+    MODEL_CHARS.inc(len(response_text), direction="response")
+    prompt_tokens = getattr(usage, 'prompt_token_count', None) or estimate_tokens(prompt)
+    response_tokens = getattr(usage, 'candidates_token_count', None) or estimate_tokens(response_text)
+    MODEL_TOKENS.inc(prompt_tokens, direction="prompt")
+    MODEL_TOKENS.inc(response_tokens, direction="response")
+
+def call_model(prompt, config, mode, pipeline="generation"):
+    """Blocking Vertex AI call with timing, usage and in-flight metrics. Returns the response text."""
+    with GENERATIONS_IN_FLIGHT.track_inprogress(mode=mode), timed_stage(STAGE_SECONDS, pipeline, "model_call"):
+        try:
+            response = llm_client.generate(prompt, config, estimated_tokens=estimate_tokens(prompt))
+            response_text = response.text
+        except ModelUnavailableError:
+            MODEL_CALLS.inc(mode=mode, outcome="rejected")
+            raise
+        except Exception:
+            MODEL_CALLS.inc(mode=mode, outcome="error")
+            raise
+    MODEL_CALLS.inc(mode=mode, outcome="success")
+    record_model_usage(prompt, response_text, getattr(response, 'usage_metadata', None))
+    return response_text
+
+def generate_resume_html(prompt):
+    """Returns the cleaned-up HTML document for `prompt`, from the cache when
+    the same inputs were generated before, otherwise from Vertex AI."""
+    cache_key = make_cache_key(prompt, MODEL_NAME, GENERATION_SETTINGS)
+    with timed_stage(STAGE_SECONDS, "generation", "cache_lookup"):
+        cached_html = resume_cache.get(cache_key)
+    if cached_html is not None:
+        return cached_html
+
+    response_text = call_model(prompt, generation_config, "html")
+
+    with timed_stage(STAGE_SECONDS, "generation", "clean_validate"):
+        ai_generated_html = clean_generated_html(response_text)
+        validate_generated_html(ai_generated_html)
+    resume_cache.put(cache_key, ai_generated_html)
+    return ai_generated_html
+
+HTML_PREFIX = "<!DOCTYPE html>"
+
+def clean_generated_html(text):
+    return text.strip().replace("```html", "").replace("```", "").strip()
+
+def validate_generated_html(ai_generated_html):
+    if not ai_generated_html.startswith(HTML_PREFIX):
+        error_snippet = ai_generated_html.replace('<', '&lt;').replace('>', '&gt;')
+        raise Exception(f"AI did not return valid HTML. Response started with: {error_snippet[:300]}...")
+
+def build_slots_prompt(profile_data, company_name, job_title, job_description):
+    """Returns (prompt, compacted profile, compaction stats) for GENERATION_MODE == "slots".
+    Item ids are kept so the model's answer can refer back to them."""
+    compacted_profile, compaction_stats = compact_profile(profile_data, job_title, job_description,
+                                                          PROMPT_TOKEN_BUDGET, keep_ids=True)
+    log_compaction(compaction_stats, company_name, job_title)
+    prompt_context = {
+        "profile_json": compact_json(compacted_profile),
+        "job_title": job_title,
+        "company_name": company_name,
+        "job_description": job_description,
+        "custom_instructions": profile_data.get('ai_custom_prompt', "")
+    }
+    try:
+        return SLOTS_AI_PROMPT.format_map(prompt_context), compacted_profile, compaction_stats
+    except KeyError as e:
+        print(f"Prompt formatting error: {e}")
+        raise Exception(f'Critical prompt error: Missing variable {e}.')
+
+def generate_resume_slots(prompt):
+    """Returns the model's slot content as a dict, using the resume cache like generate_resume_html."""
+    cache_key = make_cache_key(prompt, MODEL_NAME, SLOTS_GENERATION_SETTINGS)
+    with timed_stage(STAGE_SECONDS, "generation", "cache_lookup"):
+        slots_json = resume_cache.get(cache_key, kind="json")
+    if slots_json is not None:
+        return json.loads(slots_json)
+    response_text = call_model(prompt, slots_generation_config, "slots")
+    slots_json = response_text.strip().replace("```json", "").replace("```", "").strip()
+    try:
+        slots = json.loads(slots_json)
+    except json.JSONDecodeError:
+        slots = None
+    if not isinstance(slots, dict) or not isinstance(slots.get('summary'), str):
+        error_snippet = slots_json.replace('<', '&lt;').replace('>', '&gt;')
+        raise Exception(f"AI did not return valid resume JSON. Response started with: {error_snippet[:300]}...")
+    resume_cache.put(cache_key, slots_json, kind="json")
+    return slots
+
+def format_duration(date_started, date_ended):
+    if date_ended == 'Present': return f"{date_started} to Present"
+    if date_ended: return f"{date_started} to {date_ended}"
+    return date_started or ""
+
+def render_resume_slots(compacted_profile, slots):
+    """Fills templates/resume_slots.html with the profile items and the model's text."""
+    def tailored(section, key, description_field):
+        texts = slots.get(section) if isinstance(slots.get(section), dict) else {}
+        items = []
+        for item in compacted_profile.get(section, []):
+            item = dict(item)
+            item['description'] = texts.get(item.get('id')) or item.get(description_field, "")
+            items.append(item)
+        return sorted(items, key=lambda i: i.get(key) or "", reverse=True)
+
+    experiences = tailored('experiences', 'dateStarted', 'jobDescription')
+    for exp in experiences:
+        exp['duration'] = format_duration(exp.get('dateStarted'), exp.get('dateEnded'))
+    education = sorted((dict(e) for e in compacted_profile.get('education', [])),
+                       key=lambda e: e.get('dateStarted') or "", reverse=True)
+    for edu in education:
+        edu['duration'] = format_duration(edu.get('dateStarted'), edu.get('dateAttained'))
+    awards = sorted(compacted_profile.get('awards', []), key=lambda a: a.get('awardDate') or "", reverse=True)
+
+    with app.app_context():
+        return render_template(SLOTS_TEMPLATE,
+                               particulars=compacted_profile.get('particulars', {}),
+                               summary=slots['summary'],
+                               experiences=experiences,
+                               education=education,
+                               projects=tailored('projects', 'projectDate', 'projectDescription'),
+                               awards=awards)
+
+def generate_resume_document(profile_data, template_example, company_name, job_title, job_description):
+    """Returns (resume HTML, compaction stats) using the configured GENERATION_MODE."""
+    if GENERATION_MODE == "slots":
+        with timed_stage(STAGE_SECONDS, "generation", "build_prompt"):
+            prompt, compacted_profile, compaction_stats = build_slots_prompt(profile_data, company_name,
+                                                                             job_title, job_description)
+        slots = generate_resume_slots(prompt)
+        with timed_stage(STAGE_SECONDS, "generation", "render_slots"):
+            ai_generated_html = render_resume_slots(compacted_profile, slots)
+    else:
+        with timed_stage(STAGE_SECONDS, "generation", "build_prompt"):
+            prompt, compaction_stats = build_resume_prompt(profile_data, template_example,
+                                                           company_name, job_title, job_description)
+        ai_generated_html = generate_resume_html(prompt)
+    validate_generated_html(ai_generated_html)
+    return ai_generated_html, compaction_stats
+
+def write_generated_resume(profile_resume_dir, resume_filename, ai_generated_html,
+                           company_name, job_title, job_description, now):
+    """Writes the resume file and returns its (not yet saved) metadata entry."""
+    filepath = os.path.join(profile_resume_dir, resume_filename)
+    with timed_stage(STAGE_SECONDS, "generation", "write_file"):
+        write_html(filepath, ai_generated_html)
+    if PRERENDER_PDFS:
+        pdf_renderer.prerender(filepath)
+    return build_resume_entry(resume_filename, company_name, job_title, job_description, now)
+
+def build_resume_entry(resume_filename, company_name, job_title, job_description, now):
+    return {
+        "id": str(uuid.uuid4()),
+        "filename": resume_filename,
+        "name": f"{job_title} at {company_name}",
+        "role": job_title,
+        "company": company_name,
+        "job_description": job_description,  # For duplicate detection and regeneration
+        "generation_date": now.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+def run_resume_generation(profile_name, company_name, job_title, job_description):
+    """Job body for /add_resume: runs on the job queue, not in the request thread."""
+    profile_resume_dir = get_profile_resume_dir(profile_name)
+    now = datetime.now()
+    resume_filename = build_resume_filename(profile_name, job_title, company_name, now)
+
+    with timed_stage(STAGE_SECONDS, "generation", "load_profile"):
+        profile_data = profile_store.load(profile_name)
+    with timed_stage(STAGE_SECONDS, "generation", "load_template"):
+        template_example = load_resume_template()
+    ai_generated_html, compaction_stats = generate_resume_document(profile_data, template_example,
+                                                                   company_name, job_title, job_description)
+
+    new_resume_entry = write_generated_resume(profile_resume_dir, resume_filename, ai_generated_html,
+                                              company_name, job_title, job_description, now)
+    new_resume_entry['profile_compaction'] = compaction_stats
+    with timed_stage(STAGE_SECONDS, "generation", "save_metadata"):
+        append_resume_metadata(profile_name, [new_resume_entry])
+    return new_resume_entry
+
+def regenerate_resume_section(profile_name, entry, section, job_description, extra_instructions=""):
+    """Asks the model for a new version of one section of an existing resume and
+    splices it into the stored HTML. Only that section, the profile data it
+    draws on and the job are sent, not the template or the rest of the page.
+    The caller holds lock_for() the resume file. Returns the updated metadata entry."""
+    filepath = os.path.join(get_profile_resume_dir(profile_name), secure_filename(entry['filename']))
+    with open(filepath, 'r', encoding='utf-8') as f:
+        resume_html = f.read()
+    span = find_section(resume_html, section)
+    if span is None:
+        raise LookupError(f"This resume has no {section} section.")
+    current_section = resume_html[span[0]:span[1]]
+
+    with timed_stage(STAGE_SECONDS, "section", "build_prompt"):
+        profile_data = profile_store.load(profile_name)
+        compacted_profile, compaction_stats = compact_profile(profile_data, entry.get('role', ''),
+                                                              job_description, PROMPT_TOKEN_BUDGET)
+        log_compaction(compaction_stats, entry.get('company'), entry.get('role'))
+        section_profile = {key: compacted_profile[key] for key in RESUME_SECTIONS[section][1]
+                           if key in compacted_profile}
+        custom_instructions = "\n".join(filter(None, [profile_data.get('ai_custom_prompt', ""),
+                                                       extra_instructions]))
+        prompt = SECTION_AI_PROMPT.format_map({
+            "section_heading": section_heading(current_section),
+            "current_section": current_section,
+            "profile_json": compact_json(section_profile),
+            "job_title": entry.get('role', ''),
+            "company_name": entry.get('company', ''),
+            "job_description": job_description,
+            "custom_instructions": custom_instructions,
+        })
+
+    fragment = clean_section_fragment(call_model(prompt, generation_config, "section", pipeline="section"))
+
+    # Deleting takes the same lock, so a resume still listed now cannot vanish before the write
+    if find_resume_entry(profile_name, entry['id']) is None:
+        raise LookupError("The resume was deleted while it was being refined.")
+    with timed_stage(STAGE_SECONDS, "section", "write_file"):
+        write_html(filepath, splice_section(resume_html, span, fragment))
+    if PRERENDER_PDFS:
+        pdf_renderer.prerender(filepath)
+
+    regenerated = dict(entry.get('regenerated_sections') or {})
+    regenerated[section] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    changes = {"regenerated_sections": regenerated}
+    if not entry.get('job_description'): changes['job_description'] = job_description
+    return storage.update_resume_metadata(secure_filename(profile_name), entry['id'], changes)
+
+def run_section_regeneration(profile_name, resume_id, section, job_description, extra_instructions=""):
+    """Job body for /regenerate_section. Holds the resume file's lock from reading
+    the page to saving it, so another refine or a delete cannot interleave."""
+    entry = find_resume_entry(profile_name, resume_id)
+    if entry is None: raise LookupError("Resume not found")
+    lock = lock_for(os.path.join(get_profile_resume_dir(profile_name), secure_filename(entry['filename'])))
+    if not lock.acquire(blocking=False):
+        raise RuntimeError("This resume is already being refined.")
+    try:
+        entry = find_resume_entry(profile_name, resume_id)  # A refine that just finished changed it
+        if entry is None: raise LookupError("Resume not found")
+        return regenerate_resume_section(profile_name, entry, section, job_description, extra_instructions)
+    finally:
+        lock.release()
+
+def stream_chunk_text(chunk):
+    try:
+        return chunk.text
+    except ValueError:
+        return ""  # Chunks without text parts (e.g. only a finish reason)
+
+def stream_model_text(prompt):
+    """Yields the text of each streamed chunk, recording the same metrics as
+    call_model plus the time to the first chunk. Closing it cancels the generation."""
+    GENERATIONS_IN_FLIGHT.inc(mode="stream")
+    start = time.perf_counter()
+    stream = None
+    received = []
+    usage = None
+    outcome = "error"
+    try:
+        stream = llm_client.stream(prompt, generation_config, estimated_tokens=estimate_tokens(prompt))
+        for chunk in stream:
+            if not received:
+                record_stage(STAGE_SECONDS, "generation", "model_first_chunk", time.perf_counter() - start)
+            usage = getattr(chunk, 'usage_metadata', None) or usage
+            text = stream_chunk_text(chunk)
+            received.append(text)
+            yield text
+        outcome = "success"
+    except GeneratorExit:
+        outcome = "cancelled"
+        raise
+    except ModelUnavailableError:
+        outcome = "rejected"
+        raise
+    finally:
+        if stream is not None and hasattr(stream, 'close'):
+            stream.close()
+        GENERATIONS_IN_FLIGHT.dec(mode="stream")
+        record_stage(STAGE_SECONDS, "generation", "model_call", time.perf_counter() - start)
+        MODEL_CALLS.inc(mode="stream", outcome=outcome)
+        record_model_usage(prompt, "".join(received), usage)
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_resume_generation(profile_name, company_name, job_title, job_description):
+    """Generator behind /add_resume_stream: yields Server-Sent Events.
+
+    Chunks are forwarded as `chunk` events and appended to a .part file as
+    they arrive. The first chunks are checked against the `<!DOCTYPE html>`
+    prefix and the stream is cancelled as soon as the model starts with
+    prose or markdown instead. Ends with a `done` or `error` event.
+    """
+    profile_resume_dir = get_profile_resume_dir(profile_name)
+    now = datetime.now()
+    resume_filename = build_resume_filename(profile_name, job_title, company_name, now)
+    filepath = os.path.join(profile_resume_dir, resume_filename)
+    part_path = filepath + ".part"
+    stream = None
+    finished = False
     try:
-        with open(metadata_path, 'r', encoding='utf-8') as f: return json.load(f)
-    except (json.JSONDecodeError, IOError): return []
-def save_resume_metadata(profile_resume_dir, metadata_list):
-    metadata_path = os.path.join(profile_resume_dir, 'resumes.json')
-    with open(metadata_path, 'w', encoding='utf-8') as f: json.dump(metadata_list, f, indent=4)
+        profile_data = profile_store.load(profile_name)
+        cache_key = cached_html = None
+        if GENERATION_MODE == "slots":
+            # Slot content is small JSON rendered locally, so the page is sent in one chunk
+            rendered_html, compaction_stats = generate_resume_document(profile_data, None, company_name,
+                                                                       job_title, job_description)
+            chunks = iter([rendered_html])
+        else:
+            prompt, compaction_stats = build_resume_prompt(profile_data, load_resume_template(),
+                                                           company_name, job_title, job_description)
+            cache_key = make_cache_key(prompt, MODEL_NAME, GENERATION_SETTINGS)
+            cached_html = resume_cache.get(cache_key)
+        if cached_html is not None:
+            chunks = iter([cached_html])
+        elif cache_key is not None:
+            stream = chunks = stream_model_text(prompt)
+
+        received = []
+        validated = False
+        with open(part_path, 'w', encoding='utf-8') as f:
+            for text in chunks:
+                if not text: continue
+                received.append(text)
+                if not validated:
+                    head = "".join(received).lstrip()
+                    if "```html".startswith(head): continue  # Possibly a fence, wait for more
+                    if head.startswith("```html"): head = head[len("```html"):].lstrip()
+                    elif head.startswith("```"): head = head[len("```"):].lstrip()
+                    if HTML_PREFIX.startswith(head): continue  # Not enough text to judge yet
+                    validate_generated_html(head)
+                    validated = True
+                    text = head
+                f.write(text)
+                f.flush()
+                yield sse_event("chunk", {"text": text})
+
+        ai_generated_html = clean_generated_html("".join(received))
+        validate_generated_html(ai_generated_html)
+        write_html(filepath, ai_generated_html)  # Final copy without any markdown fences
+        os.remove(part_path)
+        if cache_key is not None and cached_html is None:
+            resume_cache.put(cache_key, ai_generated_html)
+        if PRERENDER_PDFS:
+            pdf_renderer.prerender(filepath)
+        new_resume_entry = build_resume_entry(resume_filename, company_name, job_title, job_description, now)
+        new_resume_entry['profile_compaction'] = compaction_stats
+        with timed_stage(STAGE_SECONDS, "generation", "save_metadata"):
+            append_resume_metadata(profile_name, [new_resume_entry])
+        finished = True
+        yield sse_event("done", {"resume": new_resume_entry})
+    except Exception as e:
+        print(f"Error streaming resume: {e}")
+        yield sse_event("error", {"message": f"Error generating AI resume: {e}"})
+    finally:
+        if stream is not None:
+            stream.close()  # Cancels the remaining generation
+        if not finished and os.path.exists(part_path):
+            os.remove(part_path)
+
+def run_batch_resume_generation(profile_name, items, concurrency):
+    """Job body for /add_resumes_batch.
+
+    Every prompt is built from one profile snapshot and one template read, the
+    AI calls run on a pool of at most `concurrency` threads, and resumes.json
+    is updated once at the end for all successful items.
+    """
+    profile_resume_dir = get_profile_resume_dir(profile_name)
+    now = datetime.now()
+    profile_data = profile_store.load(profile_name)
+    template_example = load_resume_template()
+
+    def generate_item(index, item):
+        resume_filename = build_resume_filename(profile_name, item['job_title'],
+                                                item['company_name'], now, suffix=f"_{index + 1}")
+        ai_generated_html, compaction_stats = generate_resume_document(profile_data, template_example,
+                                                                       item['company_name'], item['job_title'],
+                                                                       item['job_description'])
+        new_resume_entry = write_generated_resume(profile_resume_dir, resume_filename, ai_generated_html,
+                                                  item['company_name'], item['job_title'],
+                                                  item['job_description'], now)
+        new_resume_entry['profile_compaction'] = compaction_stats
+        return new_resume_entry
+
+    results = []
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="resume-batch") as pool:
+        futures = [pool.submit(generate_item, i, item) for i, item in enumerate(items)]
+        for i, future in enumerate(futures):
+            try:
+                results.append({"index": i, "status": "success", "resume": future.result()})
+            except Exception as e:
+                print(f"Error generating batch item {i}: {e}")
+                results.append({"index": i, "status": "error", "message": str(e)})
+
+    new_entries = [r['resume'] for r in results if r['status'] == "success"]
+    if new_entries:
+        append_resume_metadata(profile_name, new_entries)
+    return {"succeeded": len(new_entries), "failed": len(items) - len(new_entries), "items": results}
+
+# --- Request Timing & Metrics Endpoint ---
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    if TIMING_HEADER: start_spans()
+
+@app.after_request
+def record_request_timing(response):
+    elapsed = time.perf_counter() - g.request_start
+    HTTP_REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or "unknown",
+                                 method=request.method, status=response.status_code)
+    if TIMING_HEADER:
+        spans = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in collected_spans()]
+        spans.append(f"total;dur={elapsed * 1000:.1f}")
+        response.headers['Server-Timing'] = ", ".join(spans)
+    return response
+
+RESUME_CACHE_STATS = metrics_registry.gauge(
+    "resume_cache_stats", "Resume cache counters (memory_hits, disk_hits, misses, ...).", ("stat",))
+
+def collect_cache_metrics():
+    for stat, value in resume_cache.get_stats().items():
+        RESUME_CACHE_STATS.set(value, stat=stat)
+
+metrics_registry.add_collector(collect_cache_metrics)
+
+MODEL_CLIENT_STATS = metrics_registry.gauge(
+    "resume_model_client_stats", "Model client counters (retries, timeouts, quota_errors, rejected, "
+    "throttled_seconds, circuit_open, ...).", ("stat",))
+
+def collect_model_client_metrics():
+    for stat, value in llm_client.get_stats().items():
+        MODEL_CLIENT_STATS.set(value, stat=stat)
+
+metrics_registry.add_collector(collect_model_client_metrics)
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(metrics_registry.render(), mimetype="text/plain; version=0.0.4")
 
 # --- Resume Routes (MODIFIED) ---
 
@@ -211,17 +852,40 @@ def resumes():
     """Shows the list of resumes and passes the user's custom AI prompt."""
     if 'profile_name' not in session:
         return redirect(url_for('login'))
-    
+    return render_resumes_page()
+
+def render_resumes_page(duplicate_offer=None):
     profile_resume_dir = get_user_resume_dir()
-    resume_metadata = load_resume_metadata(profile_resume_dir)
-    resume_metadata.sort(key=lambda x: x.get('generation_date', ''), reverse=True)
+    for job in job_queue.pop_finished(profile_resume_dir):
+        if job.get('kind') == 'batch':
+            result = job.get('result') or {}
+            category = 'success' if job['state'] == SUCCEEDED and not result.get('failed') else 'error'
+            flash(f'Batch generation finished: {result.get("succeeded", 0)} of {job.get("total")} '
+                  f'resumes generated. {job.get("error") or ""}'.strip(), category)
+        elif job.get('kind') == 'section':
+            if job['state'] == SUCCEEDED:
+                flash(f'Refined the {job.get("section")} section of {job.get("company")}\'s resume', 'success')
+            else:
+                flash(f'Error regenerating section: {job.get("error")}', 'error')
+        elif job['state'] == SUCCEEDED:
+            flash(f'Successfully generated AI-tailored resume for {job.get("role")}', 'success')
+        else:
+            flash(f'Error generating AI resume: {job.get("error")}', 'error')
+    pending_jobs = [job for job in job_queue.list(profile_resume_dir) if job['state'] in ACTIVE_STATES]
+
+    resume_page = query_resumes(session['profile_name'], request.args)
+    resume_facets = resume_index.facets(secure_filename(session['profile_name']))
     
     # NEW: Load profile to get the custom prompt
-    profile_data = load_profile_data(session['profile_name'])
+    profile_data = profile_store.load(session['profile_name'])
     current_custom_prompt = profile_data.get('ai_custom_prompt', "")
         
     return render_template('resumes.html', 
-                           resume_files=resume_metadata, 
+                           resume_files=resume_page['items'],
+                           resume_page=resume_page,
+                           resume_facets=resume_facets,
+                           pending_jobs=pending_jobs,
+                           duplicate_offer=duplicate_offer,
                            current_custom_prompt=current_custom_prompt) # Pass custom prompt
 
 @app.route('/resumes/<filename>')
@@ -231,7 +895,20 @@ def view_resume(filename):
     if not profile_resume_dir: return "Not found", 404
     secure_name = secure_filename(filename)
     if secure_name != filename: return "Invalid filename", 400
-    return send_from_directory(profile_resume_dir, secure_name)
+    if not is_saved_resume(session['profile_name'], secure_name): return "Not found", 404
+    filepath = os.path.join(profile_resume_dir, secure_name)
+    if not os.path.isfile(filepath): return "Not found", 404
+    # Serve the stored .br/.gz variant the browser accepts; the strong ETag
+    # lets repeat views of an unchanged resume end in a 304.
+    accepted = sorted((e for e in VARIANT_SUFFIXES if request.accept_encodings[e] > 0),
+                      key=lambda e: request.accept_encodings[e], reverse=True)
+    send_path, encoding, etag = html_assets.select(filepath, accepted)
+    response = send_file(os.path.abspath(send_path), mimetype="text/html", etag=etag, conditional=True)
+    if encoding and response.status_code != 304:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.private = True
+    return response
 
 @app.route('/download_resume/<filename>')
 def download_resume(filename):
@@ -240,21 +917,64 @@ def download_resume(filename):
     if not profile_resume_dir: return "Not found", 404
     secure_name = secure_filename(filename)
     if secure_name != filename: return "Invalid filename", 400
+    # Rendering anything else would overwrite a cached PDF with itself or turn state files into PDFs
+    if not is_saved_resume(session['profile_name'], secure_name): return "File not found", 404
     filepath = os.path.join(profile_resume_dir, secure_name)
     if not os.path.exists(filepath): return "File not found", 404
     try:
-        html = HTML(filename=filepath) 
-        pdf_bytes = html.write_pdf()
+        with timed_stage(STAGE_SECONDS, "download", "render_total"):
+            pdf_path, render_timings = pdf_renderer.render(filepath)
+        for stage, seconds in render_timings.items():
+            record_stage(STAGE_SECONDS, "download", stage, seconds)
         pdf_filename = os.path.splitext(secure_name)[0] + '.pdf'
-        return Response(pdf_bytes, mimetype="application/pdf",
-                        headers={"Content-Disposition": f"attachment;filename={pdf_filename}"})
+        return send_file(os.path.abspath(pdf_path), mimetype="application/pdf",
+                         as_attachment=True, download_name=pdf_filename)
     except Exception as e:
         print(f"Error converting PDF: {e}")
         flash(f'Error converting file to PDF: {e}', 'error')
         return redirect(url_for('resumes'))
 
+def stream_resume_export(profile_name):
+    """Generator behind /export_resumes: yields a ZIP with html/ and pdf/
+    copies of every resume, adding each pair as soon as its PDF is ready.
+    Memory use does not grow with the number of resumes."""
+    profile_resume_dir = get_profile_resume_dir(profile_name)
+    entries = {}
+    for entry in load_resume_metadata(profile_name):
+        html_path = os.path.join(profile_resume_dir, secure_filename(entry.get('filename', '')))
+        if entry.get('filename') and os.path.exists(html_path): entries[html_path] = entry
+    archive = StreamingZip()
+    failures = []
+    started = time.perf_counter()
+    for html_path, pdf_path, error in pdf_renderer.render_many(list(entries), EXPORT_MAX_IN_FLIGHT):
+        base_name = os.path.splitext(os.path.basename(html_path))[0]
+        try:
+            yield from archive.add_file(html_path, f"html/{base_name}.html")
+            if error is None:
+                yield from archive.add_file(pdf_path, f"pdf/{base_name}.pdf")
+        except OSError as e:  # Deleted while the export was running
+            error = e
+        if error is not None:
+            print(f"Error exporting {html_path}: {error}")
+            failures.append(f"{entries[html_path].get('name', base_name)}: {error}")
+    if failures:
+        yield from archive.add_bytes("\n".join(["These resumes could not be converted to PDF:"] + failures) + "\n",
+                                     "errors.txt")
+    yield from archive.close()
+    record_stage(STAGE_SECONDS, "export", "total", time.perf_counter() - started)
+
+@app.route('/export_resumes')
+def export_resumes():
+    """Downloads all of the user's resumes (PDF and HTML) as one streamed ZIP file."""
+    if 'profile_name' not in session: return redirect(url_for('login'))
+    profile_name = session['profile_name']
+    download_name = f"{secure_filename(profile_name) or 'my'}_resumes.zip"
+    return Response(stream_with_context(stream_resume_export(profile_name)), mimetype="application/zip",
+                    headers={"Content-Disposition": f'attachment; filename="{download_name}"'})
+
 @app.route('/add_resume', methods=['POST'])
 def add_resume():
+    """Queues an AI generation job and returns immediately; the resumes page polls /resume_jobs."""
     if 'profile_name' not in session: return redirect(url_for('login'))
     profile_name = session['profile_name']
     profile_resume_dir = get_user_resume_dir()
@@ -266,80 +986,189 @@ def add_resume():
     if not all([company_name, job_title, job_description]):
         flash('All fields are required to generate an AI resume.', 'error')
         return redirect(url_for('resumes'))
-        
-    now = datetime.now()
-    datetime_str = now.strftime("%Y%m%d%H%M%S")
-    safe_profile = secure_filename(profile_name)
-    safe_job = secure_filename(job_title)
-    safe_company = secure_filename(company_name)
-    if not safe_job: safe_job = "job"
-    if not safe_company: safe_company = "company"
-    resume_filename = f"{safe_profile}_{datetime_str}_{safe_job}_{safe_company}.html"
-    
-    profile_data = load_profile_data(profile_name)
-    profile_json = json.dumps(profile_data)
-    
+
+    if request.form.get('skip_similar'):
+        DUPLICATE_DECISIONS.inc(action="generated")
+    else:
+        similar_entry, similarity = find_similar_resume(profile_name, job_description)
+        if similar_entry:
+            return render_resumes_page(duplicate_offer={
+                "resume": similar_entry, "similarity": round(similarity * 100),
+                "company_name": company_name, "job_title": job_title, "job_description": job_description})
+
+    job_queue.submit(profile_resume_dir, run_resume_generation,
+                     profile_name, company_name, job_title, job_description,
+                     role=job_title, company=company_name)
+    flash(f'Generating AI-tailored resume for {job_title}. It will appear below when ready.', 'success')
+    return redirect(url_for('resumes'))
+
+@app.route('/add_resume_stream', methods=['POST'])
+def add_resume_stream():
+    """Streaming variant of /add_resume: the HTML is sent to the browser as it is generated."""
+    if 'profile_name' not in session: return jsonify({"status": "error", "message": "Not logged in"}), 401
+    profile_name = session['profile_name']
+
+    company_name = request.form.get('company_name')
+    job_title = request.form.get('job_title')
+    job_description = request.form.get('job_description')
+
+    if not all([company_name, job_title, job_description]):
+        return jsonify({"status": "error", "message": "All fields are required to generate an AI resume."}), 400
+
+    if not request.form.get('skip_similar'):
+        similar_entry, similarity = find_similar_resume(profile_name, job_description)
+        if similar_entry:
+            # The page re-posts the form to /add_resume, which shows the reuse offer
+            return jsonify({"status": "duplicate", "resume": similar_entry['name'],
+                            "similarity": round(similarity * 100)}), 409
+    else:
+        DUPLICATE_DECISIONS.inc(action="generated")
+
+    events = stream_resume_generation(profile_name, company_name, job_title, job_description)
+    return Response(stream_with_context(events), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def adapt_resume_html(html_text, earlier_entry, company_name, job_title):
+    """Light adaptation of an earlier resume: swaps in the new company and job title
+    in the summary only. Elsewhere those names may be the candidate's real employers
+    and titles, so the rest of the page is left for the user to refine."""
+    replacements = [(html.escape(old, quote=False), html.escape(new, quote=False))
+                    for old, new in ((earlier_entry.get('company'), company_name),
+                                     (earlier_entry.get('role'), job_title))
+                    if old and old != new]
+    return replace_in_section(html_text, "summary", replacements)
+
+@app.route('/reuse_resume', methods=['POST'])
+def reuse_resume():
+    """Saves a copy of an earlier resume for a near-duplicate job instead of generating a new one."""
+    if 'profile_name' not in session: return redirect(url_for('login'))
+    profile_name = session['profile_name']
+    profile_resume_dir = get_user_resume_dir()
+    resume_id = request.form.get('resume_id')
+    company_name = request.form.get('company_name')
+    job_title = request.form.get('job_title')
+    job_description = request.form.get('job_description')
+    if not all([resume_id, company_name, job_title, job_description]):
+        flash('Missing data to reuse the resume.', 'error')
+        return redirect(url_for('resumes'))
+
+    earlier_entry = next((e for e in load_resume_metadata(profile_name) if e.get('id') == resume_id), None)
+    if earlier_entry is None:
+        flash('The earlier resume no longer exists.', 'error')
+        return redirect(url_for('resumes'))
     try:
-        with open('templates/resume_template.html', 'r', encoding='utf-8') as f:
-            template_example = f.read()
-    except FileNotFoundError:
-        flash('ERROR: resume_template.html not found.', 'error')
+        with open(os.path.join(profile_resume_dir, secure_filename(earlier_entry['filename'])), 'r',
+                  encoding='utf-8') as f:
+            earlier_html = f.read()
+        now = datetime.now()
+        resume_filename = build_resume_filename(profile_name, job_title, company_name, now)
+        new_resume_entry = write_generated_resume(profile_resume_dir, resume_filename,
+                                                  adapt_resume_html(earlier_html, earlier_entry,
+                                                                    company_name, job_title),
+                                                  company_name, job_title, job_description, now)
+        new_resume_entry['reused_from'] = resume_id
+        append_resume_metadata(profile_name, [new_resume_entry])
+    except Exception as e:
+        print(f"Error reusing resume: {e}")
+        flash(f'Error reusing resume: {e}', 'error')
         return redirect(url_for('resumes'))
 
-    # --- MODIFIED: Use the user's custom prompt ---
-    user_custom_prompt = profile_data.get('ai_custom_prompt', "")
+    DUPLICATE_DECISIONS.inc(action="reused")
+    MODEL_SECONDS_SAVED.inc(STAGE_SECONDS.average(pipeline="generation", stage="model_call") or 0)
+    flash(f'Reused your resume for {earlier_entry.get("name")} as {job_title} at {company_name}.', 'success')
+    return redirect(url_for('resumes'))
+
+@app.route('/regenerate_section', methods=['POST'])
+def regenerate_section():
+    """Queues a job that regenerates one section (summary, experiences, education,
+    projects or awards) of an existing resume in place; the page polls /resume_jobs/<id>."""
+    if 'profile_name' not in session: return jsonify({"status": "error", "message": "Not logged in"}), 401
+    profile_name = session['profile_name']
+    data = request.get_json(silent=True) or {}
+    resume_id = data.get('resume_id')
+    section = data.get('section')
+    if not resume_id or section not in RESUME_SECTIONS:
+        return jsonify({"status": "error", "message": f"resume_id and a section out of "
+                                                      f"{', '.join(RESUME_SECTIONS)} are required."}), 400
 
+    entry = find_resume_entry(profile_name, resume_id)
+    if entry is None:
+        return jsonify({"status": "error", "message": "Resume not found"}), 404
+    job_description = entry.get('job_description') or data.get('job_description')
+    if not job_description:
+        return jsonify({"status": "error", "message": "This resume was generated before job descriptions were "
+                                                      "saved; please include the job_description."}), 400
+    profile_resume_dir = get_user_resume_dir()
+    if any(job.get('kind') == 'section' and job.get('resume_id') == resume_id and job['state'] in ACTIVE_STATES
+           for job in job_queue.list(profile_resume_dir)):
+        return jsonify({"status": "error", "message": "This resume is already being refined."}), 409
+
+    job = job_queue.submit(profile_resume_dir, run_section_regeneration,
+                           profile_name, resume_id, section, job_description, data.get('instructions', ""),
+                           kind="section", resume_id=resume_id, section=section,
+                           role=f"{entry.get('role', '')} ({section} section)", company=entry.get('company', ''))
+    return jsonify({"status": "success", "job": job}), 202
+
+@app.route('/add_resumes_batch', methods=['POST'])
+def add_resumes_batch():
+    """Queues one job that tailors the profile to many postings.
+
+    Expects JSON: {"items": [{"company_name", "job_title", "job_description"}, ...],
+    "concurrency": optional int capped at BATCH_CONCURRENCY}.
+    """
+    if 'profile_name' not in session: return jsonify({"status": "error", "message": "Not logged in"}), 401
+    profile_name = session['profile_name']
+    profile_resume_dir = get_user_resume_dir()
     try:
-        # Create context dictionary to format the prompt
-        prompt_context = {
-            "profile_json": profile_json,
-            "job_title": job_title,
-            "company_name": company_name,
-            "job_description": job_description,
-            "template_example": template_example,
-            "custom_instructions": user_custom_prompt  # Inject custom instructions
-        }
-        
-        # Format the main prompt with the context
-        prompt = DEFAULT_AI_PROMPT.format_map(prompt_context)
-        
-        # Call Vertex AI
-        response = model.generate_content(prompt, generation_config=generation_config)
-        
-        ai_generated_html = response.text
-        ai_generated_html = ai_generated_html.strip().replace("```html", "").replace("```", "").strip()
-        
-        if not ai_generated_html.startswith("<!DOCTYPE html>"):
-            error_snippet = ai_generated_html.replace('<', '&lt;').replace('>', '&gt;')
-            raise Exception(f"AI did not return valid HTML. Response started with: {error_snippet[:300]}...")
+        data = request.json or {}
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({"status": "error", "message": "Missing items"}), 400
+        if len(items) > BATCH_MAX_ITEMS:
+            return jsonify({"status": "error", "message": f"At most {BATCH_MAX_ITEMS} items per batch"}), 400
+        fields = ('company_name', 'job_title', 'job_description')
+        if not all(isinstance(item, dict) and all(item.get(k) for k in fields) for item in items):
+            return jsonify({"status": "error", "message": "Every item needs company_name, job_title and job_description"}), 400
+        items = [{k: item[k] for k in fields} for item in items]
+        concurrency = max(1, min(int(data.get('concurrency') or BATCH_CONCURRENCY), BATCH_CONCURRENCY))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "Invalid batch request"}), 400
 
-        filepath = os.path.join(profile_resume_dir, resume_filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(ai_generated_html)
-            
-        metadata_list = load_resume_metadata(profile_resume_dir)
-        new_resume_entry = {
-            "id": str(uuid.uuid4()),
-            "filename": resume_filename,
-            "name": f"{job_title} at {company_name}",
-            "role": job_title,
-            "company": company_name,
-            "generation_date": now.strftime("%Y-%m-%d %H:%M:%S")
-        }
-        metadata_list.append(new_resume_entry)
-        save_resume_metadata(profile_resume_dir, metadata_list)
-        
-        flash(f'Successfully generated AI-tailored resume for {job_title}', 'success')
-        
-    except KeyError as e:
-        # This catches if the main prompt has a missing variable (our error)
-        print(f"Prompt formatting error: {e}")
-        flash(f'Critical prompt error: Missing variable {e}.', 'error')
-    except Exception as e:
-        print(f"Error generating resume: {e}")
-        flash(f'Error generating AI resume: {e}', 'error')
-        
-    return redirect(url_for('resumes'))
+    job = job_queue.submit(profile_resume_dir, run_batch_resume_generation,
+                           profile_name, items, concurrency,
+                           kind="batch", total=len(items),
+                           role=f"Batch of {len(items)} resumes", company="Multiple postings")
+    return jsonify({"status": "success", "job": job}), 202
+
+@app.route('/resume_jobs')
+def list_resume_jobs():
+    if 'profile_name' not in session: return jsonify({"status": "error", "message": "Not logged in"}), 401
+    profile_resume_dir = get_user_resume_dir()
+    return jsonify({"status": "success", "jobs": job_queue.list(profile_resume_dir)})
+
+@app.route('/resume_jobs/<job_id>')
+def get_resume_job(job_id):
+    if 'profile_name' not in session: return jsonify({"status": "error", "message": "Not logged in"}), 401
+    profile_resume_dir = get_user_resume_dir()
+    job = job_queue.get(profile_resume_dir, job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify({"status": "success", "job": job})
+
+@app.route('/api/resumes')
+def api_resumes():
+    """One page of the user's resumes, newest first, optionally filtered by
+    ?q= (full text), ?company= and ?role=."""
+    if 'profile_name' not in session: return jsonify({"status": "error", "message": "Not logged in"}), 401
+    result = query_resumes(session['profile_name'], request.args)
+    if request.args.get('facets'):
+        result['facets'] = resume_index.facets(secure_filename(session['profile_name']))
+    return jsonify(dict(result, status="success"))
+
+@app.route('/resume_cache/stats')
+def resume_cache_stats():
+    if 'profile_name' not in session: return jsonify({"status": "error", "message": "Not logged in"}), 401
+    return jsonify({"status": "success", "stats": resume_cache.get_stats()})
 
 @app.route('/delete_resume', methods=['POST'])
 def delete_resume():
@@ -350,16 +1179,27 @@ def delete_resume():
     if not resume_id:
         flash('Invalid request.', 'error')
         return redirect(url_for('resumes'))
-    metadata_list = load_resume_metadata(profile_resume_dir)
-    item_to_delete = next((item for item in metadata_list if item.get('id') == resume_id), None)
-    if item_to_delete:
-        filename = item_to_delete.get('filename')
-        if filename:
-            filepath = os.path.join(profile_resume_dir, secure_filename(filename))
+    entry = find_resume_entry(session['profile_name'], resume_id)
+    if entry is None:
+        flash('File not found.', 'error')
+        return redirect(url_for('resumes'))
+    filepath = os.path.join(profile_resume_dir, secure_filename(entry.get('filename') or resume_id))
+    lock = lock_for(filepath)
+    if not lock.acquire(blocking=False):  # A refine holds it until its new section is saved
+        flash('This resume is being refined; delete it once that has finished.', 'error')
+        return redirect(url_for('resumes'))
+    try:
+        item_to_delete = delete_resume_metadata(session['profile_name'], resume_id)
+        if item_to_delete and entry.get('filename'):
             if os.path.exists(filepath):
                 os.remove(filepath)
-        new_metadata_list = [item for item in metadata_list if item.get('id') != resume_id]
-        save_resume_metadata(profile_resume_dir, new_metadata_list)
+            discard_variants(filepath)
+            html_assets.forget(filepath)
+            pdf_renderer.discard(filepath)
+        remove_lock_file(filepath)
+    finally:
+        lock.release()
+    if item_to_delete:
         flash(f'Successfully deleted resume', 'success')
     else:
         flash('File not found.', 'error')
@@ -377,11 +1217,7 @@ def update_custom_prompt():
             return jsonify({"status": "error", "message": "No prompt provided"}), 400
             
         profile_name = session['profile_name']
-        profile_data = load_profile_data(profile_name)
-        
-        profile_data['ai_custom_prompt'] = new_prompt
-        
-        save_profile_data(profile_name, profile_data)
+        profile_store.set_field(profile_name, 'ai_custom_prompt', new_prompt)
         
         return jsonify({"status": "success", "message": "Custom prompt updated."})
         
@@ -397,9 +1233,7 @@ def update_particulars():
     try:
         new_particulars = request.json.get('particulars')
         if not new_particulars: return jsonify({"status": "error", "message": "Missing particulars data"}), 400
-        profile_data = load_profile_data(profile_name)
-        profile_data['particulars'] = new_particulars
-        save_profile_data(profile_name, profile_data)
+        profile_store.set_field(profile_name, 'particulars', new_particulars)
         return jsonify({"status": "success", "message": "Particulars updated successfully."})
     except Exception as e:
         return jsonify({"status": "error", "message": "An internal server error occurred."}), 500
@@ -412,9 +1246,7 @@ def add_experience():
         new_experience = request.json.get('experience')
         if not new_experience: return jsonify({"status": "error", "message": "Missing experience data"}), 400
         new_experience['id'] = str(uuid.uuid4())
-        profile_data = load_profile_data(profile_name)
-        profile_data["experiences"].append(new_experience)
-        save_profile_data(profile_name, profile_data)
+        profile_store.add_item(profile_name, "experiences", new_experience)
         return jsonify({"status": "success", "newItem": new_experience})
     except Exception as e:
         return jsonify({"status": "error", "message": "An internal server error occurred."}), 500
@@ -427,9 +1259,7 @@ def add_education():
         new_education = request.json.get('education')
         if not new_education: return jsonify({"status": "error", "message": "Missing education data"}), 400
         new_education['id'] = str(uuid.uuid4())
-        profile_data = load_profile_data(profile_name)
-        profile_data["education"].append(new_education)
-        save_profile_data(profile_name, profile_data)
+        profile_store.add_item(profile_name, "education", new_education)
         return jsonify({"status": "success", "newItem": new_education})
     except Exception as e:
         return jsonify({"status": "error", "message": "An internal server error occurred."}), 500
@@ -442,9 +1272,7 @@ def add_project():
         new_project = request.json.get('project')
         if not new_project: return jsonify({"status": "error", "message": "Missing project data"}), 400
         new_project['id'] = str(uuid.uuid4())
-        profile_data = load_profile_data(profile_name)
-        profile_data["projects"].append(new_project)
-        save_profile_data(profile_name, profile_data)
+        profile_store.add_item(profile_name, "projects", new_project)
         return jsonify({"status": "success", "newItem": new_project})
     except Exception as e:
         return jsonify({"status": "error", "message": "An internal server error occurred."}), 500
@@ -457,9 +1285,7 @@ def add_award():
         new_award = request.json.get('award')
         if not new_award: return jsonify({"status": "error", "message": "Missing award data"}), 400
         new_award['id'] = str(uuid.uuid4())
-        profile_data = load_profile_data(profile_name)
-        profile_data["awards"].append(new_award)
-        save_profile_data(profile_name, profile_data)
+        profile_store.add_item(profile_name, "awards", new_award)
         return jsonify({"status": "success", "newItem": new_award})
     except Exception as e:
         return jsonify({"status": "error", "message": "An internal server error occurred."}), 500
@@ -475,14 +1301,9 @@ def update_item():
         item_id = updated_item.get('id')
         if not all([item_type, updated_item, item_id]):
             return jsonify({"status": "error", "message": "Missing data"}), 400
-        profile_data = load_profile_data(profile_name)
-        if item_type not in profile_data:
+        if item_type not in ITEM_SECTIONS:
             return jsonify({"status": "error", "message": "Invalid item type"}), 400
-        item_list = profile_data[item_type]
-        index_to_update = next((i for i, item in enumerate(item_list) if item.get('id') == item_id), None)
-        if index_to_update is not None:
-            item_list[index_to_update] = updated_item
-            save_profile_data(profile_name, profile_data)
+        if profile_store.update_item(profile_name, item_type, updated_item):
             return jsonify({"status": "success", "message": "Item updated."})
         else:
             return jsonify({"status": "error", "message": "Item not found"}), 404
@@ -499,20 +1320,29 @@ def delete_item():
         item_id = data.get('id')
         if not all([item_type, item_id]):
             return jsonify({"status": "error", "message": "Missing data"}), 400
-        profile_data = load_profile_data(profile_name)
-        if item_type not in profile_data:
+        if item_type not in ITEM_SECTIONS:
             return jsonify({"status": "error", "message": "Invalid item type"}), 400
-        item_list = profile_data[item_type]
-        new_list = [item for item in item_list if item.get('id') != item_id]
-        if len(new_list) < len(item_list):
-            profile_data[item_type] = new_list
-            save_profile_data(profile_name, profile_data)
+        if profile_store.delete_item(profile_name, item_type, item_id):
             return jsonify({"status": "success", "message": "Item deleted."})
         else:
             return jsonify({"status": "error", "message": "Item not found"}), 404
     except Exception as e:
         return jsonify({"status": "error", "message": "An internal server error occurred."}), 500
         
+# --- Optional Warm-up ---
+def warm_up():
+    """Creates the model client and starts the PDF workers ahead of the first request."""
+    started = time.perf_counter()
+    try:
+        get_model()
+        pdf_renderer.warm_up()
+        print(f"Warm-up finished in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        print(f"Warm-up failed (will retry on first use): {e}")
+
+if WARMUP_ON_START:
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
 # --- Run the App ---
 if __name__ == '__main__':
     if not os.path.exists(PROFILE_DIR): os.makedirs(PROFILE_DIR)
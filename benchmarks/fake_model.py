@@ -0,0 +1,80 @@
+"""Local stand-in for vertexai's GenerativeModel, used by the benchmarks.
+
+It never touches the network: every call sleeps for a configurable latency
+(plus jitter), fails with a configurable probability and returns a resume of
+roughly the requested size built from the real resume_template.html.
+"""
+import os
+import json
+import time
+import random
+import threading
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeBackendError(Exception):
+    """Raised for simulated failures. Like google.api_core's ResourceExhausted it
+    carries code 429, so the app's LLMClient retries it and backs off."""
+    code = 429
+
+
+class FakeGenerativeModel:
+    def __init__(self, latency=2.0, jitter=0.5, failure_rate=0.0, response_bytes=6000,
+                 template_path="templates/resume_template.html", seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.response_bytes = response_bytes
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        try:
+            with open(template_path, 'r', encoding='utf-8') as f: self._template = f.read()
+        except FileNotFoundError:
+            self._template = "<!DOCTYPE html>\n<html><body></body></html>"
+
+    def _sleep_and_maybe_fail(self):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.failure_rate
+            if fail: self.failures += 1
+        time.sleep(delay)
+        if fail:
+            raise FakeBackendError("429 Resource exhausted (simulated)")
+
+    def _html(self):
+        html = self._template
+        filler = "<p>Tailored achievement line for the benchmark.</p>\n"
+        insert_at = html.rfind("</div>")
+        padding = max(0, self.response_bytes - len(html))
+        return html[:insert_at] + filler * (padding // len(filler) + 1) + html[insert_at:]
+
+    def _text_for(self, prompt):
+        if '{"summary"' in prompt:
+            # Structured-slot prompt: answer with slot JSON instead of HTML
+            return json.dumps({"summary": "Benchmark summary.", "experiences": {}, "projects": {}})
+        return self._html()
+
+    def generate_content(self, prompt, generation_config=None, stream=False, **kwargs):
+        if not stream:
+            self._sleep_and_maybe_fail()
+            return FakeResponse(self._text_for(prompt))
+
+        def chunks():
+            self._sleep_and_maybe_fail()
+            text = self._text_for(prompt)
+            for start in range(0, len(text), 512):
+                yield FakeResponse(text[start:start + 512])
+        return chunks()
+
+
+def create_model():
+    """MODEL_FACTORY entry point, e.g. MODEL_FACTORY=benchmarks.fake_model:create_model.
+    FAKE_MODEL_LATENCY sets the latency in seconds."""
+    return FakeGenerativeModel(latency=float(os.environ.get("FAKE_MODEL_LATENCY", "2.0")), jitter=0.0)
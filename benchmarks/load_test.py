@@ -0,0 +1,266 @@
+"""Offline load test for app.py.
+
+Runs the real Flask app on a local threaded server inside a scratch copy of
+the data directories, swaps Vertex AI for FakeGenerativeModel and drives
+the main routes with many concurrent simulated users.
+
+Usage:
+    python benchmarks/load_test.py --users 20 --duration 30 --latency 2 --output bench_results.json
+
+Prints throughput and p50/p95/p99 latency per route and writes the same
+numbers as JSON so runs of different versions can be compared.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import http.cookiejar
+import urllib.parse
+import urllib.request
+import urllib.error
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_model import FakeGenerativeModel  # noqa: E402
+
+ROUTES = ("/login", "/", "/resumes", "/add_resume", "/download_resume", "/update_item")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values: return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route, seconds, ok):
+        with self._lock:
+            self.latencies[route].append(seconds)
+            if not ok: self.errors[route] += 1
+
+    def summary(self, elapsed):
+        routes = {}
+        for route in ROUTES:
+            values = sorted(self.latencies.get(route, []))
+            if not values: continue
+            routes[route] = {
+                "requests": len(values),
+                "errors": self.errors.get(route, 0),
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2),
+            }
+        total = sum(r["requests"] for r in routes.values())
+        return {"elapsed_s": round(elapsed, 2), "total_requests": total,
+                "throughput_rps": round(total / elapsed, 2), "routes": routes}
+
+
+class SimulatedUser:
+    """One browser session: logs in, then cycles through the benchmarked routes."""
+
+    def __init__(self, base_url, profile_name, recorder, seed_resume):
+        self.base_url = base_url
+        self.profile_name = profile_name
+        self.recorder = recorder
+        self.seed_resume = seed_resume
+        self.item_id = None
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            _NoRedirect())
+
+    def request(self, route, path, data=None, json_body=None):
+        headers = {}
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            body = urllib.parse.urlencode(data).encode('utf-8')
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=120) as response:
+                payload = response.read()
+                status = response.status
+                content_type = response.headers.get('Content-Type', "")
+        except urllib.error.HTTPError as e:
+            payload = e.read()
+            status = e.code
+            content_type = e.headers.get('Content-Type', "")
+        except (urllib.error.URLError, OSError):
+            payload, status, content_type = b"", 0, ""
+        if route == "/download_resume":  # A failed render redirects back to /resumes, so only a PDF counts
+            ok = status == 200 and content_type.startswith("application/pdf")
+        else:
+            ok = 200 <= status < 400
+        self.recorder.record(route, time.perf_counter() - start, ok)
+        return status, payload
+
+    def setup(self):
+        self.request("/login", "/login", data={"profileName": self.profile_name, "password": "benchmark"})
+        status, payload = self.request("/add", "/add", json_body={"experience": {
+            "title": "Engineer", "company": "Benchmark Co", "dateStarted": "2020-01-01",
+            "dateEnded": "Present", "jobDescription": "Built data pipelines in Python.",
+            "skills": ["Python", "SQL"]}})
+        if status == 200:
+            self.item_id = json.loads(payload)["newItem"]["id"]
+
+    def iteration(self, number):
+        self.request("/", "/")
+        self.request("/resumes", "/resumes")
+        if self.item_id:
+            self.request("/update_item", "/update_item", json_body={"itemType": "experiences", "item": {
+                "id": self.item_id, "title": f"Engineer {number}", "company": "Benchmark Co",
+                "dateStarted": "2020-01-01", "dateEnded": "Present",
+                "jobDescription": "Built data pipelines in Python.", "skills": ["Python", "SQL"]}})
+        self.request("/download_resume", f"/download_resume/{self.seed_resume}")
+        # skip_similar and a company unique to this user and iteration: every request
+        # reaches the model instead of the reuse offer or the resume cache
+        self.request("/add_resume", "/add_resume", data={
+            "company_name": f"Company {self.profile_name}-{number}", "job_title": "Data Engineer",
+            "skip_similar": "1",
+            "job_description": "Design and operate Python and SQL data pipelines on the cloud."})
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Measure each route on its own instead of following the redirect it returns
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def prepare_workdir():
+    workdir = tempfile.mkdtemp(prefix="resume-bench-")
+    shutil.copytree(os.path.join(REPO_DIR, "templates"), os.path.join(workdir, "templates"))
+    os.makedirs(os.path.join(workdir, "profiles"))
+    os.makedirs(os.path.join(workdir, "resumes"))
+    return workdir
+
+
+def seed_resume(app_module, profile_name, fake_model):
+    """Gives each user one existing resume so /download_resume has something to render."""
+    profile_resume_dir = app_module.get_profile_resume_dir(profile_name)
+    filename = f"{profile_name}_seed.html"
+    with open(os.path.join(profile_resume_dir, filename), 'w', encoding='utf-8') as f:
+        f.write(fake_model._html())
+    return filename
+
+
+def wait_for_jobs(app_module, profile_names, timeout):
+    """Returns seconds until every queued generation finished, or None on timeout."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        active = [job for name in profile_names
+                  for job in app_module.job_queue.list(app_module.get_profile_resume_dir(name))
+                  if job['state'] in ("queued", "running")]
+        if not active:
+            return round(time.perf_counter() - start, 2)
+        time.sleep(0.2)
+    return None
+
+
+def run(args):
+    workdir = prepare_workdir()
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    import app as app_module
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    fake_model = FakeGenerativeModel(latency=args.latency, jitter=args.jitter,
+                                     failure_rate=args.failure_rate,
+                                     response_bytes=args.response_bytes, seed=args.seed)
+    app_module.set_model_factory(lambda: fake_model)
+
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True,
+                         request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    recorder = Recorder()
+    profile_names = [f"bench{i}" for i in range(args.users)]
+    users = [SimulatedUser(base_url, name, recorder, seed_resume(app_module, name, fake_model))
+             for name in profile_names]
+    for user in users: user.setup()
+
+    recorder = Recorder()  # Measure steady state only, not the signups
+    for user in users: user.recorder = recorder
+    deadline = time.perf_counter() + args.duration
+    stop = threading.Event()
+
+    def user_loop(user):
+        number = 0
+        while not stop.is_set() and time.perf_counter() < deadline:
+            user.iteration(number)
+            number += 1
+            if args.think_time: time.sleep(args.think_time)
+
+    # Logins are measured separately: every user logs in again during the run
+    def login_loop(user):
+        while not stop.is_set() and time.perf_counter() < deadline:
+            user.request("/login", "/login", data={"profileName": user.profile_name, "password": "benchmark"})
+            time.sleep(max(args.think_time, 0.5))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user_loop, args=(u,)) for u in users]
+    threads += [threading.Thread(target=login_loop, args=(u,)) for u in users[:max(1, args.users // 4)]]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - start
+
+    results = recorder.summary(elapsed)
+    results["generation_drain_s"] = wait_for_jobs(app_module, profile_names, args.drain_timeout)
+    results["model_calls"] = fake_model.calls
+    results["model_failures"] = fake_model.failures
+    results["config"] = vars(args)
+    server.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def print_report(results):
+    print(f"{'route':<18}{'reqs':>7}{'errs':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, stats in results["routes"].items():
+        print(f"{route:<18}{stats['requests']:>7}{stats['errors']:>6}{stats['throughput_rps']:>9}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+    print(f"Total: {results['total_requests']} requests in {results['elapsed_s']} s "
+          f"({results['throughput_rps']} req/s); model calls: {results['model_calls']} "
+          f"({results['model_failures']} failed); queue drained in {results['generation_drain_s']} s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline load test with a fake Vertex AI model.")
+    parser.add_argument('--users', type=int, default=10, help="Concurrent simulated users")
+    parser.add_argument('--duration', type=float, default=20, help="Seconds to run")
+    parser.add_argument('--think-time', type=float, default=0.0, help="Pause between iterations per user")
+    parser.add_argument('--latency', type=float, default=2.0, help="Fake model latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.5, help="Random +/- latency in seconds")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Fraction of model calls that fail")
+    parser.add_argument('--response-bytes', type=int, default=6000, help="Approximate size of generated HTML")
+    parser.add_argument('--drain-timeout', type=float, default=120, help="Max seconds to wait for queued jobs")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed for the fake model")
+    parser.add_argument('--output', default="bench_results.json", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    output_path = os.path.abspath(args.output)
+    results = run(args)
+    print_report(results)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {output_path}")
@@ -0,0 +1,223 @@
+"""Lost-update stress test for the multi-process server (serve.py).
+
+Starts serve.py with N worker processes in a scratch data directory, using
+the fake model, and has M concurrent clients hammer the shared JSON state at
+once:
+
+- every client signs up its own profile (passwords.json)
+- every client adds --ops experiences to one shared profile (profile
+  journal and snapshot, compacted every few edits by whichever worker
+  gets there)
+- every client queues --resumes generations on the shared profile
+  (jobs.json and resumes.json; the fake model never fails, so every
+  queued generation must end up in resumes.json)
+
+When the server has drained its queue, the files on disk are checked
+against what the clients were told succeeded. Any missing signup,
+experience, resume or job is a lost update, and the script exits with
+status 1.
+
+Usage:
+    python benchmarks/multiprocess_stress.py --workers 4 --clients 16 --ops 20 --resumes 2
+"""
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.cookiejar
+import urllib.parse
+import urllib.request
+import urllib.error
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from storage import JSONStorage  # noqa: E402
+from profile_store import ProfileStore  # noqa: E402
+from jobs import JobQueue, SUCCEEDED, ACTIVE_STATES  # noqa: E402
+
+SHARED_PROFILE = "shared"
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Client:
+    """One cookie session against the server."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, path, data=None, json_body=None):
+        headers, body = {}, None
+        if json_body is not None:
+            body = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            body = urllib.parse.urlencode(data).encode('utf-8')
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers)
+        try:
+            with self.opener.open(req, timeout=120) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def login(self, profile_name):
+        status, _ = self.request("/login", data={"profileName": profile_name, "password": "stress"})
+        return status == 302
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_server(base_url, process, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"serve.py exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(base_url + "/login", timeout=5):
+                return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.1)
+    raise TimeoutError("serve.py did not start in time")
+
+
+def run_client(index, base_url, args, results):
+    own = Client(base_url)
+    signed_up = own.login(f"client{index}")
+    shared = Client(base_url)
+    shared.login(SHARED_PROFILE)
+    experience_ids = []
+    for op in range(args.ops):
+        status, payload = shared.request("/add", json_body={"experience": {
+            "title": f"Engineer {index}-{op}", "company": "Stress Co", "dateStarted": "2020-01-01",
+            "dateEnded": "Present", "jobDescription": "Kept state consistent.", "skills": ["Python"]}})
+        if status == 200: experience_ids.append(json.loads(payload)["newItem"]["id"])
+    queued = 0
+    for number in range(args.resumes):
+        status, _ = shared.request("/add_resume", data={
+            "company_name": f"Company {index}-{number}", "job_title": "Engineer", "skip_similar": "1",
+            "job_description": f"Role {index}-{number} building reliable services."})
+        if status == 302: queued += 1
+    results[index] = {"signed_up": signed_up, "experience_ids": experience_ids, "queued": queued}
+
+
+def wait_for_jobs(queue, job_dir, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        jobs = queue.list(job_dir)
+        if not any(job['state'] in ACTIVE_STATES for job in jobs): return jobs
+        time.sleep(0.2)
+    return queue.list(job_dir)
+
+
+def verify(workdir, args, results):
+    """Returns (lost updates found on disk, counts of what was found)."""
+    storage = JSONStorage(os.path.join(workdir, "passwords.json"), os.path.join(workdir, "profiles"),
+                          os.path.join(workdir, "resumes"))
+    problems = []
+    passwords = storage.load_passwords()
+    for index, result in results.items():
+        if result["signed_up"] and f"client{index}" not in passwords:
+            problems.append(f"signup of client{index} lost")
+
+    experiences = ProfileStore(storage).load(SHARED_PROFILE).get('experiences', [])
+    stored_ids = {item.get('id') for item in experiences}
+    acknowledged = [item_id for result in results.values() for item_id in result["experience_ids"]]
+    lost = [item_id for item_id in acknowledged if item_id not in stored_ids]
+    if lost: problems.append(f"{len(lost)} of {len(acknowledged)} acknowledged experiences lost")
+    if len(experiences) != len(stored_ids):
+        problems.append(f"{len(experiences) - len(stored_ids)} duplicated experiences")
+
+    job_dir = os.path.join(workdir, "resumes", SHARED_PROFILE)
+    queue = JobQueue(max_workers=1)
+    jobs = wait_for_jobs(queue, job_dir, args.drain_timeout)
+    queued = sum(result["queued"] for result in results.values())
+    expected_jobs = min(queued, queue.max_history)  # jobs.json only keeps the newest finished jobs
+    if len(jobs) != expected_jobs:
+        problems.append(f"{expected_jobs - len(jobs)} of {expected_jobs} job records missing from jobs.json")
+    failed = [job for job in jobs if job['state'] != SUCCEEDED]
+    if failed: problems.append(f"{len(failed)} generations failed, e.g.: {failed[0].get('error')}")
+    metadata = storage.load_resume_metadata(SHARED_PROFILE)
+    if len(metadata) != queued:
+        problems.append(f"{queued - len(metadata)} of {queued} queued resumes missing from resumes.json")
+    missing_files = [e['filename'] for e in metadata if not os.path.exists(os.path.join(job_dir, e['filename']))]
+    if missing_files: problems.append(f"{len(missing_files)} resume files missing")
+    return problems, {"signups": len(passwords) - 1, "experiences": len(experiences),
+                      "acknowledged_experiences": len(acknowledged), "queued_resumes": queued,
+                      "resumes": len(metadata)}
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="resume-stress-")
+    shutil.copytree(os.path.join(REPO_DIR, "templates"), os.path.join(workdir, "templates"))
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ,
+               MODEL_FACTORY="benchmarks.fake_model:create_model",
+               FAKE_MODEL_LATENCY=str(args.latency),
+               PROFILE_COMPACT_AFTER=str(args.compact_after),
+               DUPLICATE_JD_THRESHOLD="0",
+               PYTHONPATH=REPO_DIR)
+    process = subprocess.Popen([sys.executable, os.path.join(REPO_DIR, "serve.py"), "--bind", f"127.0.0.1:{port}",
+                                "--workers", str(args.workers), "--threads", str(args.threads)],
+                               cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_server(base_url, process, args.start_timeout)
+        Client(base_url).login(SHARED_PROFILE)  # Created once, before the clients race on it
+        results = {}
+        start = time.perf_counter()
+        threads = [threading.Thread(target=run_client, args=(i, base_url, args, results))
+                   for i in range(args.clients)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        elapsed = time.perf_counter() - start
+        problems, counts = verify(workdir, args, results)
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {"config": vars(args), "elapsed_s": round(elapsed, 2), "counts": counts, "lost_updates": problems}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Checks that concurrent workers do not lose updates.")
+    parser.add_argument('--workers', type=int, default=4, help="serve.py worker processes")
+    parser.add_argument('--threads', type=int, default=4, help="Threads per worker")
+    parser.add_argument('--clients', type=int, default=16, help="Concurrent clients")
+    parser.add_argument('--ops', type=int, default=20, help="Experiences each client adds to the shared profile")
+    parser.add_argument('--resumes', type=int, default=2, help="Resumes each client queues on the shared profile")
+    parser.add_argument('--compact-after', type=int, default=10, help="PROFILE_COMPACT_AFTER for the server")
+    parser.add_argument('--latency', type=float, default=0.05, help="Fake model latency in seconds")
+    parser.add_argument('--start-timeout', type=float, default=60)
+    parser.add_argument('--drain-timeout', type=float, default=120)
+    parser.add_argument('--output', default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    results = run(args)
+    counts = results["counts"]
+    print(f"{args.workers} workers x {args.clients} clients in {results['elapsed_s']} s: "
+          f"{counts['signups']} signups, {counts['experiences']}/{counts['acknowledged_experiences']} experiences, "
+          f"{counts['resumes']}/{counts['queued_resumes']} resumes")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+    if results["lost_updates"]:
+        print("LOST UPDATES:\n  " + "\n  ".join(results["lost_updates"]))
+        sys.exit(1)
+    print("No lost updates.")
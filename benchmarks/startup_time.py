@@ -0,0 +1,132 @@
+"""Measures how long a fresh app process takes to serve its first request.
+
+Each trial starts a new Python process that imports app.py and serves it on
+a local port, then times how long it takes from process start until GET
+/login answers. The import of app.py is also timed on its own.
+
+Usage:
+    python benchmarks/startup_time.py --trials 5
+    python benchmarks/startup_time.py --trials 5 --baseline HEAD~1   # before/after
+
+--baseline extracts that git revision into a temporary directory and
+measures it with the same procedure, so the two numbers can be compared.
+"""
+import os
+import sys
+import time
+import json
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+import urllib.error
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+# Printed before the child's result: importing the app (e.g. WeasyPrint on some
+# revisions) may write its own lines to stdout first
+RESULT_MARKER = "STARTUP_RESULT"
+
+# Runs in the child process: import the app from argv[1], serve it, report the port
+SERVER_SCRIPT = """
+import os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import app as app_module
+import_seconds = time.perf_counter() - start
+from werkzeug.serving import make_server
+server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+print("%s", server.server_port, import_seconds, flush=True)
+server.serve_forever()
+""" % RESULT_MARKER
+
+
+def extract_revision(revision):
+    target = tempfile.mkdtemp(prefix="resume-startup-")
+    archive = subprocess.run(["git", "archive", revision], cwd=REPO_DIR, check=True, capture_output=True)
+    subprocess.run(["tar", "-x", "-C", target], input=archive.stdout, check=True)
+    return target
+
+
+def wait_for_first_response(url, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                response.read()
+                return
+        except urllib.error.HTTPError:
+            return  # Any HTTP answer means the app is serving
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.01)
+    raise TimeoutError(f"No response from {url} within {timeout}s")
+
+
+def measure(source_dir, env, timeout):
+    """Returns (seconds until the first response, seconds spent importing app.py)."""
+    workdir = tempfile.mkdtemp(prefix="resume-startup-work-")
+    for name in ("profiles", "resumes"): os.makedirs(os.path.join(workdir, name))
+    stderr_path = os.path.join(workdir, "stderr.log")
+    start = time.perf_counter()
+    with open(stderr_path, 'w') as stderr:
+        process = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, source_dir], cwd=workdir,
+                                   env=env, stdout=subprocess.PIPE, stderr=stderr, text=True)
+    try:
+        for line in process.stdout:
+            if line.startswith(RESULT_MARKER + " "): break
+        else:
+            with open(stderr_path, 'r', errors='replace') as f:
+                last_error = (f.read().strip().splitlines() or [""])[-1]
+            raise RuntimeError(f"Server process exited with code {process.wait()}: {last_error}")
+        _, port, import_seconds = line.split()
+        wait_for_first_response(f"http://127.0.0.1:{port}/login", timeout)
+        return time.perf_counter() - start, float(import_seconds)
+    finally:
+        process.kill()
+        process.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_trials(label, source_dir, env, trials, timeout):
+    first_response, imports = [], []
+    for _ in range(trials):
+        seconds, import_seconds = measure(source_dir, env, timeout)
+        first_response.append(seconds)
+        imports.append(import_seconds)
+    result = {
+        "label": label,
+        "trials": trials,
+        "first_request_median_ms": round(statistics.median(first_response) * 1000, 1),
+        "first_request_max_ms": round(max(first_response) * 1000, 1),
+        "import_median_ms": round(statistics.median(imports) * 1000, 1),
+    }
+    print(f"{label:<12} first request: median {result['first_request_median_ms']} ms, "
+          f"max {result['first_request_max_ms']} ms; import app.py: median {result['import_median_ms']} ms")
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time-to-first-request benchmark for app.py.")
+    parser.add_argument('--trials', type=int, default=5, help="Fresh processes to start per version")
+    parser.add_argument('--baseline', default=None, help="Git revision to compare against, e.g. HEAD~1")
+    parser.add_argument('--timeout', type=float, default=120, help="Max seconds to wait for one startup")
+    parser.add_argument('--output', default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    env = dict(os.environ, WARMUP_ON_START="0")
+    results = []
+    if args.baseline:
+        baseline_dir = extract_revision(args.baseline)
+        try:
+            results.append(run_trials(args.baseline, baseline_dir, env, args.trials, args.timeout))
+        finally:
+            shutil.rmtree(baseline_dir, ignore_errors=True)
+    results.append(run_trials("working tree", REPO_DIR, env, args.trials, args.timeout))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        print(f"Results written to {args.output}")
@@ -0,0 +1,100 @@
+import os
+import weakref
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies (single-process serving)
+    fcntl = None
+
+
+class FileLock:
+    """Advisory lock shared by the threads of this process and by every other
+    process locking the same path.
+
+    The lock lives in a separate ``<state file>.lock`` file because state
+    files are replaced atomically (a new inode each write), so locking the
+    state file itself would not exclude a writer that opened the new one.
+    The lock is reentrant per thread; the OS lock is taken by the outermost
+    acquire only.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self, blocking=True):
+        """Returns False, holding nothing, if `blocking` is False and another
+        thread or process has the lock."""
+        if not self._thread_lock.acquire(blocking): return False
+        if self._depth == 0 and fcntl is not None:
+            try:
+                lock_dir = os.path.dirname(self.path)
+                if lock_dir and not os.path.exists(lock_dir): os.makedirs(lock_dir, exist_ok=True)
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BaseException as e:
+                if self._fd is not None: os.close(self._fd)
+                self._fd = None
+                self._thread_lock.release()
+                if isinstance(e, BlockingIOError): return False
+                raise
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+# Only locks someone still references (a holder, a waiter or a caller about to
+# acquire) are kept, so one lock per resume ever refined does not pile up
+_locks = weakref.WeakValueDictionary()
+_locks_guard = threading.Lock()
+
+
+def lock_for(state_path):
+    """Returns the process-wide FileLock guarding `state_path` (via state_path + ".lock").
+    Keep the returned lock referenced from acquire() to release()."""
+    lock_path = os.path.abspath(state_path) + ".lock"
+    with _locks_guard:
+        lock = _locks.get(lock_path)
+        if lock is None:
+            lock = _locks[lock_path] = FileLock(lock_path)
+        return lock
+
+
+def remove_lock_file(state_path):
+    """Deletes the lock file of a state file that is gone for good. Call it while
+    holding lock_for(state_path): whoever gets the lock next finds the state missing."""
+    lock_path = os.path.abspath(state_path) + ".lock"
+    if os.path.exists(lock_path): os.remove(lock_path)
+
+
+def write_atomic(path, data):
+    """Replaces `path` with `data` (str is written as UTF-8): readers see the old
+    or the new file, never a partial one, and the data is on disk when this returns."""
+    if isinstance(data, str): data = data.encode('utf-8')
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
@@ -0,0 +1,181 @@
+import os
+import re
+import gzip
+import hashlib
+import threading
+
+from file_lock import write_atomic
+
+try:
+    import brotli  # Optional: without it only gzip variants are written
+except ImportError:
+    brotli = None
+
+# Content-Encoding -> file suffix, in order of preference
+VARIANT_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# Whitespace next to these tags never renders, so it can go entirely
+_BLOCK_TAGS = ("html|head|body|meta|link|title|style|script|header|footer|main|section|article|nav|div|p|"
+               "h[1-6]|ul|ol|li|dl|dt|dd|table|thead|tbody|tr|th|td|br|hr")
+# Raw text elements: their content ends at the first matching end tag, so a lazy match is exact
+_RAW_TEXT_RE = re.compile(r'<(textarea|script)\b.*?</\1\s*>', re.S | re.I)
+_STYLE_RE = re.compile(r'(<style\b[^>]*>)(.*?)(</style\s*>)', re.S | re.I)
+_COMMENT_RE = re.compile(r'<!--(?!\[if).*?-->', re.S)
+_BLOCK_TAG_RE = re.compile(r'\s*(</?(?:%s)\b[^>]*>)\s*' % _BLOCK_TAGS, re.I)
+_CSS_STRING_RE = re.compile(r'("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')')
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_CSS_PUNCTUATION_RE = re.compile(r'\s*([{};,>])\s*')
+_CSS_RULE_RE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+_PRE_WHITESPACE_RE = re.compile(r'white-space\s*:\s*(?:pre|pre-wrap|pre-line|break-spaces)\b', re.I)
+_CLASS_SELECTOR_RE = re.compile(r'\.([\w-]+)')
+_PLACEHOLDER_RE = re.compile(r'\x00(\d+)\x00')
+
+
+def _whitespace_preserving_re(html_text):
+    """Matches the start tag of elements whose whitespace renders: <pre>, a class
+    given white-space: pre* in the page's <style> blocks, or the same in an
+    inline style attribute. The tag name is in the first group that matched."""
+    classes = set()
+    for style in _STYLE_RE.finditer(html_text):
+        for selectors, body in _CSS_RULE_RE.findall(_CSS_COMMENT_RE.sub("", style.group(2))):
+            if _PRE_WHITESPACE_RE.search(body): classes.update(_CLASS_SELECTOR_RE.findall(selectors))
+    attribute = r'style\s*=\s*["\'][^"\']*white-space\s*:\s*(?:pre|pre-wrap|pre-line|break-spaces)\b'
+    if classes:
+        names = "|".join(re.escape(name) for name in sorted(classes))
+        attribute = rf'(?:class\s*=\s*["\'][^"\']*(?<![\w-])(?:{names})(?![\w-])|{attribute})'
+    return re.compile(rf'<(pre)\b[^>]*>|<([a-zA-Z][\w-]*)\b[^>]*{attribute}[^>]*>', re.I)
+
+
+def _stash_balanced(text, start_re, stash):
+    """Replaces every element whose start tag matches `start_re`, through its
+    matching end tag, with stash(element). Same-name elements nested inside are
+    counted, so the outer element is kept whole; an element that is never
+    closed keeps only its start tag."""
+    parts, pos = [], 0
+    while True:
+        start = start_re.search(text, pos)
+        if start is None: break
+        name = next(group for group in start.groups() if group)
+        depth, end = 1, start.end()
+        for tag in re.finditer(rf'<(/?){re.escape(name)}(?![\w-])[^>]*>', text[start.end():], re.I):
+            depth += -1 if tag.group(1) else 1
+            if depth == 0:
+                end = start.end() + tag.end()
+                break
+        parts.append(text[pos:start.start()])
+        parts.append(stash(text[start.start():end]))
+        pos = end
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def minify_css(css):
+    parts = _CSS_STRING_RE.split(_CSS_COMMENT_RE.sub("", css))
+    for i in range(0, len(parts), 2):  # Odd indexes are string literals, kept as written
+        code = " ".join(parts[i].split())
+        code = _CSS_PUNCTUATION_RE.sub(r'\1', code)
+        parts[i] = code.replace(': ', ':').replace(';}', '}')
+    return "".join(parts).strip()
+
+
+def minify_html(html_text):
+    """Removes comments, blank runs and whitespace around block-level tags and
+    compacts inline <style> CSS. Attributes, <pre>/<textarea>/<script> and any
+    element styled with white-space: pre* (such as .item-description, which
+    shows the model's line breaks) are left exactly as written, including
+    elements nested inside them."""
+    preserved = []  # Blocks set aside while whitespace is collapsed
+
+    def stash(block):
+        preserved.append(block)
+        return f"\x00{len(preserved) - 1}\x00"
+
+    text = _RAW_TEXT_RE.sub(lambda m: stash(m.group(0)), html_text)  # First, so tags in scripts are not parsed
+    text = _stash_balanced(text, _whitespace_preserving_re(html_text), stash)
+    text = _STYLE_RE.sub(lambda m: stash(m.group(1) + minify_css(m.group(2)) + m.group(3)), text)
+    text = _COMMENT_RE.sub("", text)
+    text = re.sub(r'\s+', ' ', text)
+    text = _BLOCK_TAG_RE.sub(r'\1', text)
+    while _PLACEHOLDER_RE.search(text):  # Stashed blocks can contain earlier placeholders
+        text = _PLACEHOLDER_RE.sub(lambda m: preserved[int(m.group(1))], text)
+    return text.strip()
+
+
+def _compress(encoding, data):
+    if encoding == "br":
+        return brotli.compress(data, mode=brotli.MODE_TEXT, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def available_encodings():
+    return [encoding for encoding in VARIANT_SUFFIXES if encoding != "br" or brotli is not None]
+
+
+def write_compressed_variants(path, data):
+    """Writes <path>.br / <path>.gz for `data` (the current bytes of path)."""
+    for encoding in available_encodings():
+        write_atomic(path + VARIANT_SUFFIXES[encoding], _compress(encoding, data))
+
+
+def write_html(path, html_text):
+    """Minifies html_text, replaces `path` with it atomically and writes its
+    precompressed variants. Returns the minified text."""
+    minified = minify_html(html_text)
+    data = minified.encode('utf-8')
+    write_atomic(path, data)
+    write_compressed_variants(path, data)
+    return minified
+
+
+def discard_variants(path):
+    for suffix in VARIANT_SUFFIXES.values():
+        if os.path.exists(path + suffix): os.remove(path + suffix)
+
+
+class HtmlAssets:
+    """Picks the stored variant of an HTML file for a request and gives it a
+    strong ETag.
+
+    The ETag is the sha256 of the uncompressed file, remembered per
+    (mtime, size) so repeat views do not hash the file again; each encoding
+    gets its own tag, as required for strong validators. A variant counts
+    only if it is at least as new as the file. Files written before
+    variants existed (or by something other than write_html) get theirs
+    on first view.
+    """
+
+    def __init__(self):
+        self._etags = {}  # path -> ((mtime_ns, size), sha256 hex)
+        self._lock = threading.Lock()
+
+    def _digest(self, path, stat):
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            known = self._etags.get(path)
+        if known and known[0] == signature: return known[1]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:32]
+        with self._lock:
+            self._etags[path] = (signature, digest)
+        return digest
+
+    def select(self, path, accepted_encodings):
+        """Returns (file to send, Content-Encoding or None, ETag) for the first
+        encoding in `accepted_encodings` (best first) we can serve."""
+        stat = os.stat(path)
+        digest = self._digest(path, stat)
+        encoding = next((e for e in accepted_encodings if e in available_encodings()), None)
+        if encoding is None: return path, None, digest
+        variant_path = path + VARIANT_SUFFIXES[encoding]
+        try:
+            fresh = os.stat(variant_path).st_mtime_ns >= stat.st_mtime_ns
+        except OSError:
+            fresh = False
+        if not fresh:
+            with open(path, 'rb') as f:
+                write_compressed_variants(path, f.read())
+        return variant_path, encoding, f"{digest}-{encoding}"
+
+    def forget(self, path):
+        with self._lock:
+            self._etags.pop(path, None)
@@ -0,0 +1,115 @@
+import re
+import hashlib
+import threading
+
+NUM_BINS = 128       # MinHash signature length
+ROWS_PER_BAND = 4    # LSH: 32 bands of 4 values each
+SHINGLE_WORDS = 2    # Word bigrams: tolerant of small edits in reposts
+_EMPTY_BIN_OFFSET = 1 << 58  # Keeps borrowed values apart from real ones (hash // NUM_BINS < 2**57)
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+
+def shingles(text):
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def minhash_signature(text, num_bins=NUM_BINS):
+    """One-permutation MinHash of the text's word shingles, or None for empty text.
+
+    Each shingle is hashed once; the hash picks a bin and the bin keeps its
+    smallest value, so the cost is linear in the text length instead of
+    (text length x signature length). Empty bins borrow from the next
+    filled bin (rotation densification) so short texts still compare well.
+    """
+    bins = [None] * num_bins
+    for shingle in shingles(text):
+        h = _hash64(shingle)
+        index, value = h % num_bins, h // num_bins
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+    if all(value is None for value in bins): return None
+    signature = []
+    for index, value in enumerate(bins):
+        distance = 0
+        while value is None:
+            distance += 1
+            value = bins[(index + distance) % num_bins]
+        signature.append(value + distance * _EMPTY_BIN_OFFSET)
+    return signature
+
+
+def estimate_similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return sum(a == b for a, b in zip(signature_a, signature_b)) / len(signature_a)
+
+
+def _bands(signature):
+    return [(start, tuple(signature[start:start + ROWS_PER_BAND]))
+            for start in range(0, len(signature), ROWS_PER_BAND)]
+
+
+class _ProfileSignatures:
+    def __init__(self):
+        self.version = None
+        self.signatures = {}  # resume id -> signature
+        self.buckets = {}     # (band start, band values) -> set of resume ids
+
+
+class JobDescriptionIndex:
+    """Per-user LSH index over the job descriptions stored with each resume.
+
+    Like ResumeIndex it follows the storage's resume_metadata_version
+    marker and only hashes job descriptions it has not seen before (a
+    resume's job description never changes).
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self, profile_folder):
+        index = self._profiles.setdefault(profile_folder, _ProfileSignatures())
+        version = self.storage.resume_metadata_version(profile_folder)
+        if version is not None and version == index.version: return index
+        entries = {e['id']: e for e in self.storage.load_resume_metadata(profile_folder)
+                   if e.get('id') and e.get('job_description')}
+        for resume_id in set(index.signatures) - set(entries):
+            for band in _bands(index.signatures.pop(resume_id)):
+                bucket = index.buckets.get(band)
+                if bucket is None: continue
+                bucket.discard(resume_id)
+                if not bucket: del index.buckets[band]
+        for resume_id, entry in entries.items():
+            if resume_id in index.signatures: continue
+            signature = minhash_signature(entry['job_description'])
+            if signature is None: continue
+            index.signatures[resume_id] = signature
+            for band in _bands(signature):
+                index.buckets.setdefault(band, set()).add(resume_id)
+        index.version = version
+        return index
+
+    def find_similar(self, profile_folder, job_description, threshold):
+        """Returns (resume id, similarity) of the most similar earlier job
+        description at or above `threshold`, or (None, best similarity seen)."""
+        signature = minhash_signature(job_description)
+        if signature is None: return None, 0.0
+        with self._lock:
+            index = self._refresh(profile_folder)
+            candidates = set()
+            for band in _bands(signature):
+                candidates |= index.buckets.get(band, set())
+            scored = [(estimate_similarity(signature, index.signatures[resume_id]), resume_id)
+                      for resume_id in candidates]
+        if not scored: return None, 0.0
+        similarity, resume_id = max(scored)
+        return (resume_id if similarity >= threshold else None), similarity
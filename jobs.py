@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from file_lock import lock_for, write_atomic
+
+# --- Job States ---
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+JOB_FILE = "jobs.json"
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class JobQueue:
+    """Runs slow work (AI generation) on a bounded thread pool.
+
+    Every job has a record in ``<job_dir>/jobs.json`` that moves through
+    queued -> running -> succeeded/failed, so the web page can poll it
+    and the outcome survives the request that created it. The file is
+    locked for every read-modify-write, so any server process can report
+    on a job another one is running.
+
+    Active jobs hold a lease: the process that queued them renews their
+    "heartbeat" (wall-clock seconds) every `heartbeat_interval`, and a job
+    whose heartbeat is older than `lease_seconds` belongs to a process that
+    stopped (a restart, a crashed worker or container) and is failed. This
+    works across hosts sharing the directory as long as their clocks agree
+    to well within the lease.
+    """
+
+    def __init__(self, max_workers=4, max_history=50, heartbeat_interval=10.0, lease_seconds=60.0):
+        self.max_workers = max_workers
+        self.max_history = max_history
+        self.heartbeat_interval = heartbeat_interval
+        self.lease_seconds = lease_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="resume-job")
+        self._owned = {}  # job_dir -> ids of the active jobs this process renews
+        self._owned_lock = threading.Lock()
+        self._heartbeat_thread = None
+
+    # --- Persistence ---
+    def _path(self, job_dir):
+        return os.path.join(job_dir, JOB_FILE)
+
+    def _load(self, job_dir):
+        path = self._path(job_dir)
+        if not os.path.exists(path): return []
+        try:
+            with open(path, 'r', encoding='utf-8') as f: jobs = json.load(f)
+        except (json.JSONDecodeError, IOError): return []
+        now = time.time()
+        with self._owned_lock:
+            owned = set(self._owned.get(job_dir, ()))
+        for job in jobs:
+            # An active job whose lease ran out was interrupted (e.g. by a
+            # restart) and will never finish.
+            if (job.get('state') in ACTIVE_STATES and job['id'] not in owned
+                    and now - (job.get('heartbeat') or 0) > self.lease_seconds):
+                job['state'] = FAILED
+                job['error'] = "Generation was interrupted by a server restart."
+                job['finished'] = job.get('finished') or _now()
+        return jobs
+
+    def _save(self, job_dir, jobs):
+        active = [j for j in jobs if j.get('state') in ACTIVE_STATES]
+        finished = [j for j in jobs if j.get('state') not in ACTIVE_STATES]
+        finished = finished[-self.max_history:]
+        keep = {j['id'] for j in active + finished}
+        jobs = [j for j in jobs if j['id'] in keep]
+        write_atomic(self._path(job_dir), json.dumps(jobs, indent=4))
+
+    def _update(self, job_dir, job_id, **fields):
+        with lock_for(self._path(job_dir)):
+            jobs = self._load(job_dir)
+            for job in jobs:
+                if job['id'] == job_id:
+                    job.update(fields)
+                    break
+            self._save(job_dir, jobs)
+
+    # --- Public API ---
+    def submit(self, job_dir, fn, *args, **fields):
+        """Queues ``fn(*args)`` and returns the new job record.
+
+        Extra keyword arguments are stored on the record (e.g. company and
+        role) so the UI can describe the job while it is pending.
+        """
+        job = {
+            "id": str(uuid.uuid4()),
+            "state": QUEUED,
+            "created": _now(),
+            "started": None,
+            "finished": None,
+            "error": None,
+            "result": None,
+            "notified": False,
+            "heartbeat": time.time(),
+        }
+        job.update(fields)
+        with lock_for(self._path(job_dir)):
+            jobs = self._load(job_dir)
+            jobs.append(job)
+            self._save(job_dir, jobs)
+        with self._owned_lock:
+            self._owned.setdefault(job_dir, set()).add(job['id'])
+            if self._heartbeat_thread is None:
+                self._heartbeat_thread = threading.Thread(target=self._renew_leases, name="job-heartbeat",
+                                                          daemon=True)
+                self._heartbeat_thread.start()
+        self._executor.submit(self._run, job_dir, job['id'], fn, args)
+        return job
+
+    def _run(self, job_dir, job_id, fn, args):
+        try:
+            self._update(job_dir, job_id, state=RUNNING, started=_now(), heartbeat=time.time())
+            try:
+                result = fn(*args)
+            except Exception as e:
+                print(f"Error in job {job_id}: {e}")
+                self._update(job_dir, job_id, state=FAILED, error=str(e), finished=_now())
+            else:
+                self._update(job_dir, job_id, state=SUCCEEDED, result=result, finished=_now())
+        finally:
+            with self._owned_lock:
+                self._owned.get(job_dir, set()).discard(job_id)
+
+    def _renew_leases(self):
+        while True:
+            time.sleep(self.heartbeat_interval)
+            with self._owned_lock:
+                owned = {job_dir: set(ids) for job_dir, ids in self._owned.items() if ids}
+                for job_dir in [d for d, ids in self._owned.items() if not ids]: del self._owned[job_dir]
+            for job_dir, ids in owned.items():
+                try:
+                    with lock_for(self._path(job_dir)):
+                        jobs = self._load(job_dir)
+                        now = time.time()
+                        for job in jobs:
+                            if job['id'] in ids and job.get('state') in ACTIVE_STATES: job['heartbeat'] = now
+                        self._save(job_dir, jobs)
+                except Exception as e:
+                    print(f"Error renewing job leases in {job_dir}: {e}")
+
+    def get(self, job_dir, job_id):
+        with lock_for(self._path(job_dir)):
+            return next((j for j in self._load(job_dir) if j['id'] == job_id), None)
+
+    def list(self, job_dir):
+        """Returns all job records, newest first."""
+        with lock_for(self._path(job_dir)):
+            jobs = self._load(job_dir)
+        jobs.sort(key=lambda j: j.get('created', ''), reverse=True)
+        return jobs
+
+    def pop_finished(self, job_dir):
+        """Returns finished jobs the user has not been told about yet and
+        marks them as notified."""
+        with lock_for(self._path(job_dir)):
+            jobs = self._load(job_dir)
+            finished = [j for j in jobs
+                        if j.get('state') not in ACTIVE_STATES and not j.get('notified')]
+            if finished:
+                for job in finished: job['notified'] = True
+                self._save(job_dir, jobs)
+        return finished
@@ -0,0 +1,319 @@
+import os
+import time
+import random
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# Errors worth another attempt: quota (429), overload and transient server/network failures
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded",
+                         "InternalServerError", "BadGateway", "GatewayTimeout", "Aborted", "Unknown"}
+QUOTA_ERROR_NAMES = {"ResourceExhausted", "TooManyRequests"}
+
+
+class ModelUnavailableError(Exception):
+    """Raised without calling the model: the circuit is open or the rate limit
+    wait would be longer than the client's max_queue_seconds."""
+
+
+class ModelTimeoutError(TimeoutError):
+    pass
+
+
+def _status_code(exc):
+    code = getattr(exc, 'code', None)
+    try:
+        return int(code)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc):
+    if isinstance(exc, (TimeoutError, ConnectionError)): return True
+    return type(exc).__name__ in RETRYABLE_ERROR_NAMES or _status_code(exc) in RETRYABLE_STATUS_CODES
+
+
+def is_quota_error(exc):
+    return type(exc).__name__ in QUOTA_ERROR_NAMES or _status_code(exc) == 429
+
+
+# --- Token buckets ---
+# A bucket holds up to `capacity` tokens and refills at `rate` per second.
+# reserve() always takes the amount, letting the balance go negative, and
+# returns how long the caller must wait before using it. Callers queue up
+# in reservation order and a request larger than the capacity still passes.
+
+class MemoryBucketState:
+    """Buckets shared by the threads of one process."""
+
+    def __init__(self):
+        self._buckets = {}  # name -> (tokens, last refill)
+        self._lock = threading.Lock()
+
+    def reserve(self, name, amount, capacity, rate):
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(name, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate) - amount
+            self._buckets[name] = (tokens, now)
+        return max(0.0, -tokens / rate)
+
+    def drain(self, name, capacity, rate):
+        """Empties the bucket, e.g. after the backend answered 429."""
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(name, (capacity, now))
+            self._buckets[name] = (min(0.0, tokens), now)
+
+
+class SQLiteBucketState:
+    """Buckets shared by every process using the same database file, so
+    several app workers stay within one quota together."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS rate_buckets (
+            name TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL
+        );
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir and not os.path.exists(db_dir): os.makedirs(db_dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _update(self, name, capacity, rate, change):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()  # Wall clock: monotonic clocks are not comparable across processes
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE name = ?", (name,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = change(min(capacity, tokens + max(0.0, now - updated) * rate))
+            conn.execute("INSERT OR REPLACE INTO rate_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                         (name, tokens, now))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return tokens
+
+    def reserve(self, name, amount, capacity, rate):
+        return max(0.0, -self._update(name, capacity, rate, lambda tokens: tokens - amount) / rate)
+
+    def drain(self, name, capacity, rate):
+        self._update(name, capacity, rate, lambda tokens: min(0.0, tokens))
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets in front of the model.
+    A limit of 0 turns that bucket off."""
+
+    def __init__(self, state, requests_per_minute=0, tokens_per_minute=0):
+        self.state = state
+        self.limits = {name: (per_minute, per_minute / 60.0)
+                       for name, per_minute in (("requests", requests_per_minute), ("tokens", tokens_per_minute))
+                       if per_minute > 0}
+
+    def reserve(self, estimated_tokens):
+        """Takes one request and `estimated_tokens` tokens; returns the seconds to wait."""
+        wait = 0.0
+        for name, (capacity, rate) in self.limits.items():
+            amount = 1 if name == "requests" else min(estimated_tokens, capacity)
+            wait = max(wait, self.state.reserve(name, amount, capacity, rate))
+        return wait
+
+    def penalize(self):
+        """Called on a quota error: everyone sharing the state backs off until the buckets refill."""
+        for name, (capacity, rate) in self.limits.items():
+            self.state.drain(name, capacity, rate)
+
+
+# --- Circuit breaker ---
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures. While open,
+    calls fail immediately; after `reset_timeout` seconds one trial call is let
+    through (half-open) and its outcome closes or re-opens the circuit."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    raise ModelUnavailableError(
+                        f"The AI service is failing; not retrying for another {remaining:.0f}s.")
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._trial_running:
+                    raise ModelUnavailableError("The AI service is recovering; please try again shortly.")
+                self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_running = False
+
+    def release(self):
+        """Ends a half-open trial that never reached the service."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+# --- Client ---
+
+class LLMClient:
+    """Calls the model from `get_model` through the rate limiter and circuit
+    breaker, with a per-call timeout and jittered exponential retries.
+
+    Only retryable errors (see is_retryable) are retried and count as
+    breaker failures; anything else, such as a blocked response, is the
+    caller's problem and is raised straight away. The SDK call has no
+    timeout of its own, so it runs on a small thread pool and is abandoned
+    (its result discarded) when it takes longer than `timeout`.
+    """
+
+    def __init__(self, get_model, limiter=None, breaker=None, timeout=120.0, max_retries=3,
+                 backoff_base=1.0, backoff_max=30.0, max_queue_seconds=60.0, max_workers=32):
+        self.get_model = get_model
+        self.limiter = limiter
+        self.breaker = breaker or CircuitBreaker()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_queue_seconds = max_queue_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+        self.stats = {"calls": 0, "retries": 0, "timeouts": 0, "quota_errors": 0,
+                      "rejected": 0, "throttled_seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def _count(self, stat, amount=1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, circuit_open=int(self.breaker.state != "closed"))
+
+    def _admit(self, estimated_tokens):
+        """Waits for the rate limiter, or fails fast when the circuit is open or the queue too long."""
+        try:
+            self.breaker.before_call()
+        except ModelUnavailableError:
+            self._count("rejected")
+            raise
+        if self.limiter is None: return
+        wait = self.limiter.reserve(estimated_tokens)
+        if wait > self.max_queue_seconds:
+            self._count("rejected")
+            self.breaker.release()
+            raise ModelUnavailableError(f"The AI service quota is exhausted; the wait would be {wait:.0f}s.")
+        if wait > 0:
+            self._count("throttled_seconds", wait)
+            time.sleep(wait)
+
+    def _run_with_timeout(self, fn, *args, **kwargs):
+        future = self._executor.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            self._count("timeouts")
+            raise ModelTimeoutError(f"The AI service did not answer within {self.timeout:g}s.") from None
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))  # Full jitter
+
+    def _attempts(self, call, estimated_tokens):
+        """Runs `call` (already wrapped in the timeout) with admission and retries."""
+        for attempt in range(self.max_retries + 1):
+            self._admit(estimated_tokens)
+            self._count("calls")
+            try:
+                result = call()
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.record_success()  # The service answered; the request was the problem
+                    raise
+                self.breaker.record_failure()
+                if is_quota_error(e):
+                    self._count("quota_errors")
+                    if self.limiter is not None: self.limiter.penalize()
+                if attempt == self.max_retries: raise
+                delay = self._backoff(attempt)
+                print(f"Model call failed ({type(e).__name__}: {e}); retry {attempt + 1} in {delay:.1f}s")
+                self._count("retries")
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def generate(self, prompt, generation_config=None, estimated_tokens=0):
+        """Blocking generate_content(); returns the response."""
+        def call():
+            def run():
+                response = self.get_model().generate_content(prompt, generation_config=generation_config)
+                response.text  # Raises here (inside the timeout) if the response has no text
+                return response
+            return self._run_with_timeout(run)
+        return self._attempts(call, estimated_tokens)
+
+    def stream(self, prompt, generation_config=None, estimated_tokens=0):
+        """Streaming generate_content(); yields chunks. Retries and the timeout
+        cover the call up to the first chunk, since nothing has been handed to
+        the caller yet; later failures are raised as they happen."""
+        def call():
+            def first_chunk():
+                stream = self.get_model().generate_content(prompt, generation_config=generation_config,
+                                                           stream=True)
+                iterator = iter(stream)
+                try:
+                    return stream, iterator, next(iterator)
+                except StopIteration:
+                    return stream, iterator, None
+                except BaseException:
+                    if hasattr(stream, 'close'): stream.close()
+                    raise
+            return self._run_with_timeout(first_chunk)
+
+        stream, iterator, chunk = self._attempts(call, estimated_tokens)
+        try:
+            if chunk is None: return
+            yield chunk
+            yield from iterator
+        except Exception as e:
+            if is_retryable(e): self.breaker.record_failure()
+            raise
+        finally:
+            if hasattr(stream, 'close'): stream.close()
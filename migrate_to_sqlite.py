@@ -0,0 +1,51 @@
+"""One-shot migration of the JSON file tree into the SQLite storage backend.
+
+Usage:
+    python migrate_to_sqlite.py [--db resume_hacker.db]
+
+Copies passwords.json, profiles/*.json and resumes/<user>/resumes.json into
+the database. Re-running it overwrites the migrated rows with the current
+JSON contents. Generated resume HTML files stay where they are. Afterwards
+start the app with STORAGE_BACKEND=sqlite.
+"""
+import argparse
+
+from storage import JSONStorage, SQLiteStorage
+from profile_store import ProfileStore
+
+PROFILE_DIR = "profiles"
+PASSWORD_FILE = "passwords.json"
+RESUME_DIR = "resumes"
+STORAGE_DB = "resume_hacker.db"
+
+
+def migrate(source, target):
+    passwords = source.load_passwords()
+    for profile_name, password_hash in passwords.items():
+        target.set_password_hash(profile_name, password_hash)
+
+    profiles = source.list_profiles()
+    source_profiles = ProfileStore(source)  # Applies any journaled edits on top of the snapshot
+    for profile_name in profiles:
+        if source.read_profile_state(profile_name)[0] is None:
+            print(f"Skipping unreadable profile: {profile_name}")
+            continue
+        target.write_profile(profile_name, source_profiles.load(profile_name))
+
+    resume_count = 0
+    for profile_folder in source.list_resume_owners():
+        metadata_list = [entry for entry in source.load_resume_metadata(profile_folder) if entry.get('id')]
+        target.save_resume_metadata(profile_folder, metadata_list)
+        resume_count += len(metadata_list)
+
+    return {"users": len(passwords), "profiles": len(profiles), "resumes": resume_count}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Migrate JSON storage into SQLite.")
+    parser.add_argument('--db', default=STORAGE_DB, help="SQLite database file to create or update")
+    args = parser.parse_args()
+
+    counts = migrate(JSONStorage(PASSWORD_FILE, PROFILE_DIR, RESUME_DIR), SQLiteStorage(args.db))
+    print(f"Migrated {counts['users']} users, {counts['profiles']} profiles and "
+          f"{counts['resumes']} resume entries into {args.db}")
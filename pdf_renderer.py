@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from file_lock import write_atomic
+
+
+def pdf_path_for(html_path):
+    return os.path.splitext(html_path)[0] + '.pdf'
+
+
+def _meta_path_for(pdf_path):
+    return pdf_path + '.json'
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_fingerprint(html_path):
+    stat = os.stat(html_path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": _file_sha256(html_path)}
+
+
+def _load_engine():
+    """Runs in a worker process: pays the WeasyPrint import cost ahead of the first render."""
+    import weasyprint  # noqa: F401
+    return os.getpid()
+
+
+def _render_pdf(html_path, pdf_path, fingerprint):
+    """Runs in a worker process: lays out the HTML file and writes the PDF, then
+    its sidecar, before the caller's future resolves. Returns the PDF path and
+    the seconds spent in each step."""
+    from weasyprint import HTML
+    start = time.perf_counter()
+    document = HTML(filename=html_path).render()
+    laid_out = time.perf_counter()
+    write_atomic(pdf_path, document.write_pdf())
+    write_atomic(_meta_path_for(pdf_path), json.dumps(fingerprint))
+    return pdf_path, {"pdf_layout": laid_out - start, "pdf_write": time.perf_counter() - laid_out}
+
+
+class PdfRenderer:
+    """Renders resume HTML to PDF on a process pool and keeps the result next
+    to the HTML file as ``<name>.pdf``.
+
+    A ``<name>.pdf.json`` sidecar records the source's mtime, size and
+    sha256. A matching mtime/size is trusted as-is; otherwise the hash
+    decides, so touching a file without changing it does not re-render.
+    """
+
+    def __init__(self, max_workers=None, timeout=60):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.RLock()
+        self._in_flight = {}  # html_path -> Future, so concurrent clicks share one render
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def warm_up(self):
+        """Starts the worker processes and imports WeasyPrint in them."""
+        executor = self._get_executor()
+        workers = self.max_workers or os.cpu_count() or 1
+        for future in [executor.submit(_load_engine) for _ in range(workers)]:
+            future.result(timeout=self.timeout)
+
+    def cached_pdf(self, html_path):
+        """Returns the path of a PDF that is current for html_path, or None."""
+        pdf_path = pdf_path_for(html_path)
+        meta_path = _meta_path_for(pdf_path)
+        if not os.path.exists(pdf_path) or not os.path.exists(meta_path): return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f: meta = json.load(f)
+            stat = os.stat(html_path)
+        except (json.JSONDecodeError, IOError, OSError): return None
+        if meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('size') == stat.st_size:
+            return pdf_path
+        fingerprint = _source_fingerprint(html_path)
+        if meta.get('sha256') != fingerprint['sha256']: return None
+        self._write_meta(meta_path, fingerprint)
+        return pdf_path
+
+    def _write_meta(self, meta_path, fingerprint):
+        write_atomic(meta_path, json.dumps(fingerprint))
+
+    def submit(self, html_path):
+        """Starts (or joins) a background render of html_path and returns its Future."""
+        pdf_path = pdf_path_for(html_path)
+
+        def _done(fut):
+            with self._lock:
+                self._in_flight.pop(html_path, None)
+            if fut.exception() is not None:
+                print(f"Error rendering PDF for {html_path}: {fut.exception()}")
+
+        with self._lock:
+            future = self._in_flight.get(html_path)
+            if future is not None: return future
+            # Fingerprint before rendering: if the HTML changes mid-render, the
+            # sidecar describes the old content and the next check re-renders.
+            fingerprint = _source_fingerprint(html_path)
+            future = self._get_executor().submit(_render_pdf, html_path, pdf_path, fingerprint)
+            self._in_flight[html_path] = future
+        future.add_done_callback(_done)
+        return future
+
+    def render(self, html_path):
+        """Returns (path of an up-to-date PDF for html_path, render timings).
+        Timings are empty when the cached PDF was used."""
+        pdf_path = self.cached_pdf(html_path)
+        if pdf_path: return pdf_path, {}
+        return self.submit(html_path).result(timeout=self.timeout)
+
+    def render_many(self, html_paths, max_in_flight):
+        """Yields (html_path, pdf_path, error) for each input in completion order.
+
+        Cached PDFs are yielded right away; the rest are rendered with at most
+        `max_in_flight` jobs submitted at once, so a long list never queues
+        all of its work (or holds all of its results) at the same time.
+        """
+        pending = iter(html_paths)
+        in_flight = {}  # Future -> html_path
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) < max_in_flight:
+                html_path = next(pending, None)
+                if html_path is None:
+                    exhausted = True
+                    break
+                pdf_path = self.cached_pdf(html_path)
+                if pdf_path:
+                    yield html_path, pdf_path, None
+                    continue
+                try:
+                    in_flight[self.submit(html_path)] = html_path
+                except Exception as e:  # e.g. the HTML file vanished
+                    yield html_path, None, e
+            if not in_flight: return
+            done, _ = wait(in_flight, timeout=self.timeout, return_when=FIRST_COMPLETED)
+            if not done:  # Nothing finished within the timeout: give up on what is left
+                for html_path in in_flight.values():
+                    yield html_path, None, TimeoutError(f"PDF rendering took longer than {self.timeout}s")
+                in_flight.clear()
+                continue
+            for future in done:
+                html_path = in_flight.pop(future)
+                if future.exception() is None:
+                    yield html_path, future.result()[0], None
+                else:
+                    yield html_path, None, future.exception()
+
+    def prerender(self, html_path):
+        if self.cached_pdf(html_path) is None:
+            self.submit(html_path)
+
+    def discard(self, html_path):
+        pdf_path = pdf_path_for(html_path)
+        for path in (pdf_path, _meta_path_for(pdf_path)):
+            if os.path.exists(path): os.remove(path)
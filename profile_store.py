@@ -0,0 +1,223 @@
+import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# --- MODIFIED: Default Profile Structure ---
+DEFAULT_PARTICULARS = {
+    "name": "", "email": "", "languages": [], "country": ""
+}
+DEFAULT_PROFILE = {
+    "particulars": DEFAULT_PARTICULARS.copy(),
+    "experiences": [], "education": [], "projects": [], "awards": [],
+    "ai_custom_prompt": ""  # NEW: For user's custom instructions
+}
+# Lists of items with an "id" that the editor adds to, updates and deletes from
+ITEM_SECTIONS = ("experiences", "education", "projects", "awards")
+# Top-level fields that are replaced as a whole
+PROFILE_FIELDS = ("particulars", "ai_custom_prompt")
+
+
+def new_profile():
+    return copy.deepcopy(DEFAULT_PROFILE)
+
+
+def normalize_profile(data):
+    """Fills in missing sections/particulars so every profile has the default shape."""
+    profile_data = new_profile()
+    if isinstance(data, list):
+        # Legacy format: the file only held the experiences list
+        profile_data['experiences'] = data
+    elif isinstance(data, dict):
+        profile_data.update(data)
+        particulars = DEFAULT_PARTICULARS.copy()
+        particulars['languages'] = []
+        particulars.update(data.get('particulars') or {})
+        profile_data['particulars'] = particulars
+        # NEW: Ensure ai_custom_prompt exists
+        profile_data['ai_custom_prompt'] = data.get('ai_custom_prompt', "")
+    return profile_data
+
+
+def is_valid_profile_name(profile_name):
+    return not (".." in profile_name or "/" in profile_name or "\\" in profile_name)
+
+
+def _item_position(items, section, item_id, positions):
+    if positions is None:
+        return next((i for i, item in enumerate(items) if item.get('id') == item_id), None)
+    if section not in positions:
+        positions[section] = {item.get('id'): i for i, item in enumerate(items)}
+    index = positions[section].get(item_id)
+    return index if index is not None and items[index].get('id') == item_id else None
+
+
+def apply_profile_op(profile_data, op, positions=None):
+    """Applies one journal op and returns (new profile, applied).
+
+    profile_data is never modified: the top-level dict and the touched
+    section list are copied, so dicts already handed to readers stay as
+    they were. `positions` is an optional {section: {id: index}} lookup
+    kept up to date across calls.
+
+    Ops: {"op": "set", "field", "value"}, {"op": "add", "section", "item"},
+    {"op": "update", "section", "item"}, {"op": "delete", "section", "id"}.
+    """
+    new_data = dict(profile_data)
+    if op['op'] == 'set':
+        new_data[op['field']] = op['value']
+        return new_data, True
+    section = op['section']
+    items = list(profile_data.get(section) or [])
+    if op['op'] == 'add':
+        items.append(op['item'])
+        if positions is not None and section in positions:
+            positions[section][op['item'].get('id')] = len(items) - 1
+    elif op['op'] in ('update', 'delete'):
+        item_id = op['item'].get('id') if op['op'] == 'update' else op['id']
+        index = _item_position(items, section, item_id, positions)
+        if index is None: return profile_data, False
+        if op['op'] == 'update':
+            items[index] = op['item']
+        else:
+            del items[index]
+            if positions is not None: positions.pop(section, None)  # Later indexes shifted
+    else:
+        raise ValueError(f"Unknown profile op: {op['op']}")
+    new_data[section] = items
+    return new_data, True
+
+
+class _CachedProfile:
+    def __init__(self, version, data, seq=None, pending_ops=0, positions=None):
+        self.version = version
+        self.data = data
+        self.seq = seq                  # Journal seq the data is current to
+        self.pending_ops = pending_ops  # Ops not yet folded into the snapshot
+        self.positions = positions if positions is not None else {}
+
+
+class ProfileStore:
+    """Keeps parsed profiles in memory on top of a storage backend.
+
+    A cached profile is reused while the backend reports the same version
+    (file inode/mtime/size for JSON, a row counter for SQLite), so
+    read-heavy pages skip the parse. Every change holds the backend's
+    cross-process profile lock across its read-modify-write, so concurrent
+    edits cannot drop each other even from other server workers.
+
+    Single-item changes (add_item, update_item, delete_item, set_field) are
+    appended to the backend's profile journal instead of rewriting the
+    profile, and an id -> position index makes updates and deletes O(1).
+    Once `compact_after` ops have piled up, a background thread folds the
+    journal into the snapshot.
+    """
+
+    def __init__(self, storage, compact_after=100):
+        self.storage = storage
+        self.compact_after = compact_after
+        self._cache = {}  # profile_name -> _CachedProfile
+        self._locks_guard = threading.Lock()
+        self._compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profile-compaction")
+        self._compaction_scheduled = set()
+
+    def _lock_for(self, profile_name):
+        return self.storage.profile_lock(profile_name)
+
+    def _current(self, profile_name):
+        """Returns the up-to-date _CachedProfile, or None if the profile does not exist."""
+        version = self.storage.profile_version(profile_name)
+        if version is None:
+            self._cache.pop(profile_name, None)
+            return None
+        cached = self._cache.get(profile_name)
+        if cached and cached.version == version:
+            return cached
+        version, data, seq, ops = self.storage.read_profile_state(profile_name)
+        if version is None: return None
+        profile_data = normalize_profile(data)
+        positions = {}
+        for _, op in ops:
+            profile_data, _ = apply_profile_op(profile_data, op, positions)
+        if ops: seq = ops[-1][0]
+        cached = _CachedProfile(version, profile_data, seq, len(ops), positions)
+        self._cache[profile_name] = cached
+        return cached
+
+    def load(self, profile_name):
+        """Returns the profile. The dict is shared with other readers: treat it as
+        read-only and use ``save`` or the item methods to change it."""
+        if not is_valid_profile_name(profile_name): return new_profile()
+        cached = self._current(profile_name)
+        return cached.data if cached else new_profile()
+
+    def save(self, profile_name, profile_data):
+        if not is_valid_profile_name(profile_name):
+            raise ValueError("Invalid profile name")
+        full_data = normalize_profile(profile_data if isinstance(profile_data, dict) else None)
+        with self._lock_for(profile_name):
+            version = self.storage.write_profile(profile_name, full_data)
+            self._cache[profile_name] = _CachedProfile(version, full_data)
+
+    def _apply(self, profile_name, op):
+        if not is_valid_profile_name(profile_name):
+            raise ValueError("Invalid profile name")
+        with self._lock_for(profile_name):
+            cached = self._current(profile_name) or _CachedProfile(None, new_profile())
+            # The op works on its own index so a failed append leaves the cache as it was;
+            # copying the touched section's index costs no more than copying its list
+            positions = dict(cached.positions)
+            if op.get('section') in positions: positions[op['section']] = dict(positions[op['section']])
+            profile_data, applied = apply_profile_op(cached.data, op, positions)
+            if not applied: return False
+            version, seq = self.storage.append_profile_op(profile_name, op)
+            if version is None:  # No snapshot to journal against yet
+                self.save(profile_name, profile_data)
+                return True
+            cached = _CachedProfile(version, profile_data, seq, cached.pending_ops + 1, positions)
+            self._cache[profile_name] = cached
+            if cached.pending_ops >= self.compact_after:
+                self._schedule_compaction(profile_name)
+        return True
+
+    def add_item(self, profile_name, section, item):
+        if section not in ITEM_SECTIONS: raise ValueError(f"Invalid section: {section}")
+        self._apply(profile_name, {"op": "add", "section": section, "item": item})
+
+    def update_item(self, profile_name, section, item):
+        """Replaces the item with the same id. Returns False if there is none."""
+        if section not in ITEM_SECTIONS: raise ValueError(f"Invalid section: {section}")
+        return self._apply(profile_name, {"op": "update", "section": section, "item": item})
+
+    def delete_item(self, profile_name, section, item_id):
+        """Removes the item with this id. Returns False if there is none."""
+        if section not in ITEM_SECTIONS: raise ValueError(f"Invalid section: {section}")
+        return self._apply(profile_name, {"op": "delete", "section": section, "id": item_id})
+
+    def set_field(self, profile_name, field, value):
+        if field not in PROFILE_FIELDS: raise ValueError(f"Invalid field: {field}")
+        if field == 'particulars':
+            value = normalize_profile({'particulars': value})['particulars']
+        self._apply(profile_name, {"op": "set", "field": field, "value": value})
+
+    def _schedule_compaction(self, profile_name):
+        with self._locks_guard:
+            if profile_name in self._compaction_scheduled: return
+            self._compaction_scheduled.add(profile_name)
+        self._compactor.submit(self._run_compaction, profile_name)
+
+    def _run_compaction(self, profile_name):
+        with self._locks_guard:
+            self._compaction_scheduled.discard(profile_name)
+        try:
+            self.compact(profile_name)
+        except Exception as e:
+            print(f"Error compacting profile journal for {profile_name}: {e}")
+
+    def compact(self, profile_name):
+        """Folds the profile's journal into its snapshot."""
+        with self._lock_for(profile_name):
+            cached = self._current(profile_name)
+            if not cached or not cached.pending_ops: return
+            version = self.storage.compact_profile_journal(profile_name, cached.data, cached.seq)
+            self._cache[profile_name] = _CachedProfile(version, cached.data, cached.seq, 0, cached.positions)
+
@@ -0,0 +1,123 @@
+import re
+import json
+import math
+from collections import Counter
+
+# Fields that carry no meaning for the model (internal ids, prompt settings
+# that are passed to it separately).
+NON_SEMANTIC_FIELDS = {"id", "ai_custom_prompt", "ai_prompt"}
+# Profile sections whose items compete for the token budget.
+RANKED_SECTIONS = ("experiences", "projects", "awards")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have",
+    "in", "is", "it", "its", "of", "on", "or", "our", "that", "the", "their", "this",
+    "to", "we", "will", "with", "you", "your", "i", "my", "me", "was", "were",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+def estimate_tokens(text):
+    """Rough Gemini token count (about 4 characters per token)."""
+    return math.ceil(len(text) / 4)
+
+
+def compact_json(data):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def strip_non_semantic(value, drop_fields=NON_SEMANTIC_FIELDS):
+    """Drops id/prompt fields and empty values, recursively."""
+    if isinstance(value, dict):
+        stripped = {k: strip_non_semantic(v, drop_fields) for k, v in value.items() if k not in drop_fields}
+        return {k: v for k, v in stripped.items() if v not in ("", None, [], {})}
+    if isinstance(value, list):
+        return [v for v in (strip_non_semantic(v, drop_fields) for v in value) if v not in ("", None, [], {})]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def tokenize(text):
+    return [t.strip(".") for t in _TOKEN_RE.findall(text.lower()) if t.strip(".") not in STOPWORDS]
+
+
+def _item_text(item):
+    if isinstance(item, dict): return " ".join(_item_text(v) for v in item.values())
+    if isinstance(item, list): return " ".join(_item_text(v) for v in item)
+    return str(item)
+
+
+def bm25_scores(documents, query, k1=1.5, b=0.75):
+    """Scores each tokenized document against the query terms with Okapi BM25."""
+    if not documents: return []
+    doc_count = len(documents)
+    avg_len = sum(len(d) for d in documents) / doc_count or 1.0
+    doc_freq = Counter(term for d in documents for term in set(d))
+    query_terms = set(query)
+    scores = []
+    for doc in documents:
+        term_freq = Counter(doc)
+        score = 0.0
+        for term in query_terms:
+            tf = term_freq.get(term)
+            if not tf: continue
+            idf = math.log(1 + (doc_count - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / avg_len))
+        scores.append(score)
+    return scores
+
+
+def compact_profile(profile_data, job_title, job_description, token_budget, keep_ids=False):
+    """Returns (compacted profile, stats) for use in the generation prompt.
+
+    Non-semantic fields and empty values are always removed. Experiences,
+    projects and awards are then ranked by BM25 relevance to the job and
+    the best ones are kept until the profile JSON fits in `token_budget`
+    tokens (0 disables the budget). Kept items stay in their original
+    order; at least one experience is always kept. `keep_ids` retains item
+    ids for prompts whose answer refers back to specific items.
+    """
+    tokens_before = estimate_tokens(json.dumps(profile_data))
+    drop_fields = NON_SEMANTIC_FIELDS - {"id"} if keep_ids else NON_SEMANTIC_FIELDS
+    stripped = strip_non_semantic(profile_data, drop_fields)
+
+    candidates = []  # (section, index, item)
+    for section in RANKED_SECTIONS:
+        for index, item in enumerate(stripped.get(section, [])):
+            candidates.append((section, index, item))
+    scores = bm25_scores([tokenize(_item_text(item)) for _, _, item in candidates],
+                         tokenize(f"{job_title} {job_description}"))
+
+    kept = set()
+    if token_budget:
+        base = {k: v for k, v in stripped.items() if k not in RANKED_SECTIONS}
+        used = estimate_tokens(compact_json(base))
+        ranked = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+        for i in ranked:
+            section, index, item = candidates[i]
+            cost = estimate_tokens(compact_json(item)) + 1
+            is_first_experience = section == "experiences" and not any(s == "experiences" for s, _ in kept)
+            if used + cost <= token_budget or is_first_experience:
+                kept.add((section, index))
+                used += cost
+    else:
+        kept = {(section, index) for section, index, _ in candidates}
+
+    compacted = dict(stripped)
+    for section in RANKED_SECTIONS:
+        if section not in stripped: continue
+        items = [item for index, item in enumerate(stripped[section]) if (section, index) in kept]
+        if items:
+            compacted[section] = items
+        else:
+            compacted.pop(section)
+
+    stats = {
+        "tokens_before": tokens_before,
+        "tokens_after": estimate_tokens(compact_json(compacted)),
+        "items_total": len(candidates),
+        "items_kept": len(kept),
+    }
+    return compacted, stats
@@ -0,0 +1,110 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from file_lock import write_atomic
+
+# File extension per kind of cached output, so HTML pages and slot JSON can never be read back as each other
+CACHE_EXTENSIONS = {"html": ".html", "json": ".json"}
+
+
+def make_cache_key(prompt, model_name, generation_settings):
+    """Hashes everything that determines the model output.
+
+    The prompt is DEFAULT_AI_PROMPT formatted with the profile JSON, job
+    fields, template and custom instructions, so editing any of them yields
+    a new key and old entries simply stop being hit.
+    """
+    payload = json.dumps({
+        "prompt": prompt,
+        "model": model_name,
+        "generation_config": generation_settings,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResumeCache:
+    """Two-tier cache of generated resume HTML (or slot JSON, kind="json"): an
+    in-memory LRU in front of a directory of files evicted oldest-first once it
+    exceeds max_disk_bytes."""
+
+    def __init__(self, cache_dir, max_memory_entries=64, max_disk_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None  # Computed on first disk access
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _path(self, key, kind):
+        return os.path.join(self.cache_dir, key + CACHE_EXTENSIONS[kind])
+
+    @staticmethod
+    def _is_entry(dir_entry):
+        return dir_entry.is_file() and dir_entry.name.endswith(tuple(CACHE_EXTENSIONS.values()))
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _scan_disk(self):
+        if self._disk_bytes is None:
+            if not os.path.exists(self.cache_dir): os.makedirs(self.cache_dir, exist_ok=True)
+            self._disk_bytes = sum(e.stat().st_size for e in os.scandir(self.cache_dir) if self._is_entry(e))
+
+    def _evict_disk(self):
+        if self._disk_bytes <= self.max_disk_bytes: return
+        entries = [e for e in os.scandir(self.cache_dir) if self._is_entry(e)]
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries:
+            if self._disk_bytes <= self.max_disk_bytes: break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._disk_bytes -= size
+            self.stats['evictions'] += 1
+
+    def get(self, key, kind="html"):
+        with self._lock:
+            memory_key = (kind, key)
+            if memory_key in self._memory:
+                self._memory.move_to_end(memory_key)
+                self.stats['memory_hits'] += 1
+                return self._memory[memory_key]
+            path = self._path(key, kind)
+            try:
+                with open(path, 'r', encoding='utf-8') as f: value = f.read()
+                os.utime(path)  # Mark as recently used for eviction order
+            except (IOError, OSError):
+                self.stats['misses'] += 1
+                return None
+            self.stats['disk_hits'] += 1
+            self._remember(memory_key, value)
+            return value
+
+    def put(self, key, value, kind="html"):
+        with self._lock:
+            self._scan_disk()
+            path = self._path(key, kind)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            write_atomic(path, value)
+            self._disk_bytes += os.path.getsize(path) - old_size
+            self.stats['stores'] += 1
+            self._remember((kind, key), value)
+            self._evict_disk()
+
+    def get_stats(self):
+        with self._lock:
+            hits = self.stats['memory_hits'] + self.stats['disk_hits']
+            lookups = hits + self.stats['misses']
+            return dict(self.stats,
+                        memory_entries=len(self._memory),
+                        disk_bytes=self._disk_bytes,
+                        hit_rate=round(hits / lookups, 4) if lookups else 0.0)
@@ -0,0 +1,181 @@
+import os
+import math
+import threading
+from html.parser import HTMLParser
+
+from prompt_compaction import tokenize
+
+# Entry fields left out of query results to keep pages small; items carry
+# has_job_description instead, since only those resumes can be refined
+LIST_EXCLUDED_FIELDS = {"job_description"}
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the visible text of a resume page (skips <style>/<script>)."""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("style", "script"): self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in ("style", "script") and self._skip: self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip: self.parts.append(data)
+
+
+def html_text(html):
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return " ".join(parser.parts)
+
+
+def _normalize(value):
+    return " ".join((value or "").split()).casefold()
+
+
+class _UserIndex:
+    """Index of one user's resumes: newest-first order, company/role postings
+    and a term -> resume ids inverted index over the resume text."""
+
+    def __init__(self):
+        self.version = None
+        self.entries = {}     # id -> metadata entry
+        self.order = []       # ids, newest first
+        self.rank = {}        # id -> position in order
+        self.companies = {}   # normalized company -> set of ids
+        self.roles = {}       # normalized role -> set of ids
+        self.labels = {"companies": [], "roles": []}  # distinct values as first written
+        self.terms = {}       # term -> set of ids
+        self.doc_terms = {}   # id -> (file signature, set of terms)
+
+
+class ResumeIndex:
+    """Keeps a query index per user on top of the storage backend.
+
+    Each query compares the storage's resume_metadata_version marker and,
+    when it changed, applies the difference: only resumes that were added or
+    whose HTML file changed are read and tokenized again. A page of results
+    then costs the same whether the user has ten resumes or a thousand.
+    """
+
+    def __init__(self, storage, resume_dir):
+        self.storage = storage
+        self.resume_dir = resume_dir
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _file_signature(self, profile_folder, filename):
+        try:
+            stat = os.stat(os.path.join(self.resume_dir, profile_folder, filename))
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _read_terms(self, profile_folder, entry):
+        text = " ".join(str(entry.get(field) or "") for field in ("name", "role", "company"))
+        try:
+            with open(os.path.join(self.resume_dir, profile_folder, entry['filename']), 'r', encoding='utf-8') as f:
+                text += " " + html_text(f.read())
+        except (IOError, OSError, KeyError):
+            pass
+        return set(tokenize(text))
+
+    def _refresh(self, profile_folder):
+        """Returns the up-to-date index for profile_folder. Caller holds self._lock."""
+        index = self._indexes.setdefault(profile_folder, _UserIndex())
+        version = self.storage.resume_metadata_version(profile_folder)
+        if version is not None and version == index.version: return index
+
+        metadata_list = [e for e in self.storage.load_resume_metadata(profile_folder) if e.get('id')]
+        # Newest first; for equal dates the entry added later comes first
+        positions = {entry['id']: i for i, entry in enumerate(metadata_list)}
+        metadata_list.sort(key=lambda e: (e.get('generation_date') or "", positions[e['id']]), reverse=True)
+
+        for resume_id in set(index.doc_terms) - set(positions):
+            self._remove_terms(index, resume_id)
+
+        for entry in metadata_list:
+            signature = self._file_signature(profile_folder, entry.get('filename', ''))
+            known = index.doc_terms.get(entry['id'])
+            if known and known[0] == signature: continue
+            if known: self._remove_terms(index, entry['id'])
+            terms = self._read_terms(profile_folder, entry)
+            index.doc_terms[entry['id']] = (signature, terms)
+            for term in terms:
+                index.terms.setdefault(term, set()).add(entry['id'])
+
+        index.entries = {entry['id']: entry for entry in metadata_list}
+        index.order = [entry['id'] for entry in metadata_list]
+        index.rank = {resume_id: i for i, resume_id in enumerate(index.order)}
+        index.companies, index.roles = {}, {}
+        labels = {"companies": {}, "roles": {}}
+        for entry in reversed(metadata_list):
+            for field, postings, names in (('company', index.companies, labels["companies"]),
+                                           ('role', index.roles, labels["roles"])):
+                key = _normalize(entry.get(field))
+                postings.setdefault(key, set()).add(entry['id'])
+                if key: names.setdefault(key, entry[field])
+        index.labels = {kind: sorted(names.values(), key=str.casefold) for kind, names in labels.items()}
+        index.version = version
+        return index
+
+    @staticmethod
+    def _remove_terms(index, resume_id):
+        _, terms = index.doc_terms.pop(resume_id)
+        for term in terms:
+            postings = index.terms.get(term)
+            if postings is None: continue
+            postings.discard(resume_id)
+            if not postings: del index.terms[term]
+
+    def query(self, profile_folder, text="", company="", role="", page=1, per_page=20):
+        """Returns one page of the user's resumes, newest first.
+
+        `company` and `role` match whole values case-insensitively; every
+        word of `text` must appear in the resume (job title, company or
+        generated content).
+        """
+        page = max(1, page)
+        with self._lock:
+            index = self._refresh(profile_folder)
+            matches = None
+            if company:
+                matches = set(index.companies.get(_normalize(company), ()))
+            if role:
+                postings = index.roles.get(_normalize(role), set())
+                matches = postings.copy() if matches is None else matches & postings
+            for term in tokenize(text or ""):
+                postings = index.terms.get(term, set())
+                matches = postings.copy() if matches is None else matches & postings
+                if not matches: break
+
+            start = (page - 1) * per_page
+            if matches is None:
+                total = len(index.order)
+                page_ids = index.order[start:start + per_page]
+            else:
+                total = len(matches)
+                page_ids = sorted(matches, key=index.rank.__getitem__)[start:start + per_page]
+            items = [dict({k: v for k, v in index.entries[resume_id].items() if k not in LIST_EXCLUDED_FIELDS},
+                          has_job_description=bool(index.entries[resume_id].get('job_description')))
+                     for resume_id in page_ids]
+
+        return {
+            "items": items,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "pages": max(1, math.ceil(total / per_page)),
+        }
+
+    def facets(self, profile_folder):
+        """Returns the distinct companies and roles (as first written) for filter menus."""
+        with self._lock:
+            labels = self._refresh(profile_folder).labels
+        return {kind: list(names) for kind, names in labels.items()}
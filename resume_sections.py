@@ -0,0 +1,57 @@
+import re
+
+# Sections of resume_template.html that can be regenerated on their own:
+# name -> (heading keyword, profile keys the model needs for it)
+RESUME_SECTIONS = {
+    "summary": ("summary", ("particulars", "experiences", "projects", "education", "awards")),
+    "experiences": ("experience", ("experiences",)),
+    "education": ("education", ("education",)),
+    "projects": ("project", ("projects",)),
+    "awards": ("award", ("awards",)),
+}
+
+_SECTION_RE = re.compile(r'<section\b[^>]*\bclass\s*=\s*["\'][^"\']*\bsection\b[^"\']*["\'][^>]*>.*?</section\s*>',
+                         re.S | re.I)
+_HEADING_RE = re.compile(r'<h2\b[^>]*>(.*?)</h2\s*>', re.S | re.I)
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def section_heading(fragment):
+    match = _HEADING_RE.search(fragment)
+    return " ".join(_TAG_RE.sub("", match.group(1)).split()) if match else ""
+
+
+def find_section(html_text, section):
+    """Returns the (start, end) span of the `<section class="section">` whose
+    <h2> heading matches `section` (a RESUME_SECTIONS key), or None."""
+    keyword = RESUME_SECTIONS[section][0]
+    for match in _SECTION_RE.finditer(html_text):
+        if keyword in section_heading(match.group(0)).lower():
+            return match.span()
+    return None
+
+
+def clean_section_fragment(text):
+    """Strips markdown fences around a model answer and checks it is exactly one section element."""
+    fragment = text.strip().replace("```html", "").replace("```", "").strip()
+    matches = list(_SECTION_RE.finditer(fragment))
+    if len(matches) != 1 or matches[0].span() != (0, len(fragment)):
+        error_snippet = fragment.replace('<', '&lt;').replace('>', '&gt;')
+        raise Exception(f"AI did not return a single <section> element. Response started with: {error_snippet[:300]}...")
+    return fragment
+
+
+def splice_section(html_text, span, fragment):
+    start, end = span
+    return html_text[:start] + fragment + html_text[end:]
+
+
+def replace_in_section(html_text, section, replacements):
+    """Applies the (old, new) text replacements inside one section only, leaving
+    the rest of the page as it was. Pages without that section are returned unchanged."""
+    span = find_section(html_text, section)
+    if span is None: return html_text
+    fragment = html_text[span[0]:span[1]]
+    for old, new in replacements:
+        fragment = fragment.replace(old, new)
+    return splice_section(html_text, span, fragment)
@@ -0,0 +1,69 @@
+"""Production entry point: serves app.py from several gunicorn worker processes.
+
+`python app.py` stays the single-process development server. This script
+runs the same app under gunicorn (Linux/macOS) with WEB_CONCURRENCY worker
+processes, each with GUNICORN_THREADS threads so streamed generations and
+slow model calls do not block a whole worker. All workers share the data
+directories; the JSON storage and job files are guarded by advisory file
+locks (see file_lock.py) and written by atomic replace.
+
+Metrics are kept per process: a /metrics scrape reports only the worker
+that answered it, so counters jump between scrapes as requests land on
+different workers. Use --workers 1 when the totals need to be exact.
+
+Usage:
+    WEB_CONCURRENCY=4 python serve.py --bind 0.0.0.0:8000
+
+Run it from the directory that holds passwords.json, profiles/ and resumes/.
+"""
+import os
+import argparse
+
+from gunicorn.app.base import BaseApplication
+
+
+class ResumeServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # Imported in each worker after the fork: every worker gets its own
+        # thread pools, PDF process pool and model client.
+        from app import app
+        return app
+
+
+def main():
+    cpus = os.cpu_count() or 2
+    parser = argparse.ArgumentParser(description="Multi-process server for the resume app.")
+    parser.add_argument('--bind', default=os.environ.get("BIND", "127.0.0.1:8000"))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get("WEB_CONCURRENCY", str(cpus))))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get("GUNICORN_THREADS", "8")))
+    parser.add_argument('--timeout', type=int, default=int(os.environ.get("GUNICORN_TIMEOUT", "300")),
+                        help="Seconds before a silent worker is restarted (AI calls can be slow)")
+    args = parser.parse_args()
+
+    for directory in ("profiles", "resumes"):
+        if not os.path.exists(directory): os.makedirs(directory)
+    if args.workers > 1:
+        # One quota and a fair share of CPUs for PDF rendering across all workers
+        os.environ.setdefault("MODEL_LIMITER_DB", "model_limits.db")
+        os.environ.setdefault("PDF_RENDER_WORKERS", str(max(1, cpus // args.workers)))
+
+    ResumeServer({
+        "bind": args.bind,
+        "workers": args.workers,
+        "worker_class": "gthread",
+        "threads": args.threads,
+        "timeout": args.timeout,
+        "graceful_timeout": 30,
+    }).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,473 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from file_lock import lock_for, write_atomic
+
+
+def _atomic_write_json(path, data, indent=4):
+    write_atomic(path, json.dumps(data, indent=indent))
+
+
+def _read_last_line(path, block_size=4096):
+    """Returns the last complete line of a text file without reading all of it."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        data = b""
+        while end > 0:
+            start = max(0, end - block_size)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+            lines = data.rstrip(b"\n").split(b"\n")
+            if len(lines) > 1 or end == 0:
+                return lines[-1].decode('utf-8')
+    return ""
+
+
+class JSONStorage:
+    """The original flat-file layout: passwords.json, profiles/<name>.json and
+    resumes/<folder>/resumes.json.
+
+    Profile edits are appended to profiles/<name>.journal (one JSON op per
+    line, numbered by "seq") and folded into the snapshot by
+    compact_profile_journal. The snapshot records the last seq it contains
+    under "_journal_seq", so a crash between rewriting the snapshot and
+    trimming the journal cannot apply an op twice.
+
+    Every write, and every read-modify-write as a whole, holds an advisory
+    lock on the state file (passwords.json, a profile, a resumes.json), so
+    several server processes can share the directories without losing
+    updates. The locks are reentrant, so the save_* methods take them too.
+    """
+
+    def __init__(self, password_file, profile_dir, resume_dir):
+        self.password_file = password_file
+        self.profile_dir = profile_dir
+        self.resume_dir = resume_dir
+
+    # --- Passwords ---
+    def load_passwords(self):
+        if not os.path.exists(self.password_file): return {}
+        try:
+            with open(self.password_file, 'r', encoding='utf-8') as f: return json.load(f)
+        except (json.JSONDecodeError, IOError): return {}
+
+    def save_passwords(self, passwords):
+        with lock_for(self.password_file):
+            _atomic_write_json(self.password_file, passwords)
+
+    def get_password_hash(self, profile_name):
+        return self.load_passwords().get(profile_name)
+
+    def set_password_hash(self, profile_name, password_hash):
+        with lock_for(self.password_file):
+            passwords = self.load_passwords()
+            passwords[profile_name] = password_hash
+            self.save_passwords(passwords)
+
+    def create_user(self, profile_name, password_hash):
+        """Adds the user unless the name is taken; returns whether it was added."""
+        with lock_for(self.password_file):
+            passwords = self.load_passwords()
+            if profile_name in passwords: return False
+            passwords[profile_name] = password_hash
+            self.save_passwords(passwords)
+            return True
+
+    # --- Profiles ---
+    def _profile_path(self, profile_name):
+        return os.path.join(self.profile_dir, f"{profile_name}.json")
+
+    def list_profiles(self):
+        if not os.path.exists(self.profile_dir): return []
+        return sorted(os.path.splitext(n)[0] for n in os.listdir(self.profile_dir) if n.endswith('.json'))
+
+    def profile_lock(self, profile_name):
+        """Cross-process lock for one profile's snapshot and journal (reentrant)."""
+        return lock_for(self._profile_path(profile_name))
+
+    def _journal_path(self, profile_name):
+        return os.path.join(self.profile_dir, f"{profile_name}.journal")
+
+    def profile_version(self, profile_name):
+        """Cheap change marker for a profile (snapshot and journal), or None if it does not exist."""
+        try:
+            stat = os.stat(self._profile_path(profile_name))
+        except OSError:
+            return None
+        try:
+            journal_size = os.stat(self._journal_path(profile_name)).st_size
+        except OSError:
+            journal_size = 0
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size, journal_size)
+
+    def _read_journal(self, profile_name):
+        """Returns the journal lines as dicts; a torn last line (crash mid-append) is skipped."""
+        try:
+            with open(self._journal_path(profile_name), 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except (IOError, OSError):
+            return []
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return records
+
+    def _snapshot_seq(self, profile_name):
+        try:
+            with open(self._profile_path(profile_name), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError, OSError):
+            return 0
+        return data.get('_journal_seq', 0) if isinstance(data, dict) else 0
+
+    def _last_journal_seq(self, profile_name):
+        # The journal always ends with the newest op or with a header carrying the snapshot's seq
+        try:
+            return json.loads(_read_last_line(self._journal_path(profile_name)))['seq']
+        except (IOError, OSError, json.JSONDecodeError, KeyError, TypeError):
+            return self._snapshot_seq(profile_name)
+
+    def read_profile_state(self, profile_name):
+        """Returns (version, snapshot data, snapshot seq, [(seq, op), ...] newer than the
+        snapshot) or (None, None, 0, []) if the profile is missing/unreadable."""
+        with self.profile_lock(profile_name):
+            version = self.profile_version(profile_name)
+            if version is None: return None, None, 0, []
+            try:
+                with open(self._profile_path(profile_name), 'r', encoding='utf-8') as f: data = json.load(f)
+            except (json.JSONDecodeError, IOError): return None, None, 0, []
+            records = self._read_journal(profile_name)
+        snapshot_seq = data.pop('_journal_seq', 0) if isinstance(data, dict) else 0
+        ops = [(r['seq'], r['op']) for r in records if 'op' in r and r.get('seq', 0) > snapshot_seq]
+        return version, data, snapshot_seq, ops
+
+    def _write_snapshot(self, profile_name, profile_data, seq):
+        if not os.path.exists(self.profile_dir): os.makedirs(self.profile_dir, exist_ok=True)
+        _atomic_write_json(self._profile_path(profile_name), dict(profile_data, _journal_seq=seq))
+
+    def write_profile(self, profile_name, profile_data):
+        """Replaces the whole profile (snapshot and journal) and returns its new version."""
+        with self.profile_lock(profile_name):
+            seq = self._last_journal_seq(profile_name)
+            self._write_snapshot(profile_name, profile_data, seq)
+            self._write_journal(profile_name, [{"seq": seq}])
+            return self.profile_version(profile_name)
+
+    def _write_journal(self, profile_name, records):
+        """Atomically replaces the journal; the first record is the header {"seq": snapshot seq}."""
+        write_atomic(self._journal_path(profile_name),
+                     "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records))
+
+    def append_profile_op(self, profile_name, op):
+        """Appends one edit to the journal. Returns (new version, its seq), or
+        (None, None) if the profile has no snapshot yet."""
+        with self.profile_lock(profile_name):
+            if not os.path.exists(self._profile_path(profile_name)): return None, None
+            seq = self._last_journal_seq(profile_name) + 1
+            with open(self._journal_path(profile_name), 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"seq": seq, "op": op}, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            return self.profile_version(profile_name), seq
+
+    def compact_profile_journal(self, profile_name, profile_data, seq):
+        """Writes profile_data (the state after op `seq`) as the new snapshot and
+        drops the ops it contains from the journal. Returns the new version."""
+        with self.profile_lock(profile_name):
+            self._write_snapshot(profile_name, profile_data, seq)
+            newer = [r for r in self._read_journal(profile_name) if 'op' in r and r['seq'] > seq]
+            self._write_journal(profile_name, [{"seq": seq}] + newer)
+            return self.profile_version(profile_name)
+
+    # --- Resume Metadata ---
+    def _metadata_path(self, profile_folder):
+        return os.path.join(self.resume_dir, profile_folder, 'resumes.json')
+
+    def list_resume_owners(self):
+        if not os.path.exists(self.resume_dir): return []
+        return sorted(n for n in os.listdir(self.resume_dir)
+                      if os.path.isdir(os.path.join(self.resume_dir, n)))
+
+    def resume_metadata_version(self, profile_folder):
+        """Cheap change marker for a user's resume list, or None if it has none."""
+        try:
+            stat = os.stat(self._metadata_path(profile_folder))
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def load_resume_metadata(self, profile_folder):
+        metadata_path = self._metadata_path(profile_folder)
+        if not os.path.exists(metadata_path): return []
+        try:
+            with open(metadata_path, 'r', encoding='utf-8') as f: return json.load(f)
+        except (json.JSONDecodeError, IOError): return []
+
+    def save_resume_metadata(self, profile_folder, metadata_list):
+        profile_resume_dir = os.path.join(self.resume_dir, profile_folder)
+        if not os.path.exists(profile_resume_dir): os.makedirs(profile_resume_dir, exist_ok=True)
+        with lock_for(self._metadata_path(profile_folder)):
+            _atomic_write_json(self._metadata_path(profile_folder), metadata_list)
+
+    def add_resume_metadata(self, profile_folder, new_entries):
+        with lock_for(self._metadata_path(profile_folder)):
+            metadata_list = self.load_resume_metadata(profile_folder)
+            metadata_list.extend(new_entries)
+            self.save_resume_metadata(profile_folder, metadata_list)
+
+    def update_resume_metadata(self, profile_folder, resume_id, changes):
+        """Merges `changes` into one entry and returns it, or None if it was not found."""
+        with lock_for(self._metadata_path(profile_folder)):
+            metadata_list = self.load_resume_metadata(profile_folder)
+            entry = next((item for item in metadata_list if item.get('id') == resume_id), None)
+            if entry is None: return None
+            entry.update(changes)
+            self.save_resume_metadata(profile_folder, metadata_list)
+            return entry
+
+    def delete_resume_metadata(self, profile_folder, resume_id):
+        """Removes one entry and returns it, or None if it was not found."""
+        with lock_for(self._metadata_path(profile_folder)):
+            metadata_list = self.load_resume_metadata(profile_folder)
+            item_to_delete = next((item for item in metadata_list if item.get('id') == resume_id), None)
+            if item_to_delete:
+                self.save_resume_metadata(profile_folder,
+                                          [item for item in metadata_list if item.get('id') != resume_id])
+            return item_to_delete
+
+
+class SQLiteStorage:
+    """Same interface as JSONStorage backed by one SQLite database in WAL mode.
+
+    Users, profiles and resumes are rows keyed by name/id, so logging in,
+    signing up or adding a resume touches only the rows involved.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            profile_name TEXT PRIMARY KEY,
+            password_hash TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS profiles (
+            profile_name TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            version INTEGER NOT NULL DEFAULT 1,
+            journal_seq INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS profile_ops (
+            profile_name TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            PRIMARY KEY (profile_name, seq)
+        );
+        CREATE TABLE IF NOT EXISTS resumes (
+            id TEXT PRIMARY KEY,
+            profile_folder TEXT NOT NULL,
+            generation_date TEXT,
+            position INTEGER NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS resumes_by_profile
+            ON resumes (profile_folder, position);
+        CREATE TABLE IF NOT EXISTS resume_versions (
+            profile_folder TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(self.SCHEMA)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(profiles)")]
+        if 'journal_seq' not in columns:  # Databases created before the profile journal
+            conn.execute("ALTER TABLE profiles ADD COLUMN journal_seq INTEGER NOT NULL DEFAULT 0")
+
+    def profile_lock(self, profile_name):
+        """Cross-process lock held by ProfileStore across a read-modify-write of one profile."""
+        return lock_for(os.path.join(self.db_path + ".locks", profile_name))
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir and not os.path.exists(db_dir): os.makedirs(db_dir, exist_ok=True)
+            # Autocommit mode; writes use explicit BEGIN IMMEDIATE transactions
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self, mode="IMMEDIATE"):
+        conn = self._connect()
+        conn.execute(f"BEGIN {mode}")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # --- Passwords ---
+    def load_passwords(self):
+        rows = self._connect().execute("SELECT profile_name, password_hash FROM users").fetchall()
+        return dict(rows)
+
+    def save_passwords(self, passwords):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM users")
+            conn.executemany("INSERT INTO users (profile_name, password_hash) VALUES (?, ?)",
+                             passwords.items())
+
+    def get_password_hash(self, profile_name):
+        row = self._connect().execute("SELECT password_hash FROM users WHERE profile_name = ?",
+                                      (profile_name,)).fetchone()
+        return row[0] if row else None
+
+    def set_password_hash(self, profile_name, password_hash):
+        with self._transaction() as conn:
+            conn.execute("INSERT INTO users (profile_name, password_hash) VALUES (?, ?) "
+                         "ON CONFLICT(profile_name) DO UPDATE SET password_hash = excluded.password_hash",
+                         (profile_name, password_hash))
+
+    def create_user(self, profile_name, password_hash):
+        with self._transaction() as conn:
+            cursor = conn.execute("INSERT INTO users (profile_name, password_hash) VALUES (?, ?) "
+                                  "ON CONFLICT(profile_name) DO NOTHING", (profile_name, password_hash))
+            return cursor.rowcount == 1
+
+    # --- Profiles ---
+    def list_profiles(self):
+        rows = self._connect().execute("SELECT profile_name FROM profiles ORDER BY profile_name").fetchall()
+        return [row[0] for row in rows]
+
+    def profile_version(self, profile_name):
+        row = self._connect().execute("SELECT version FROM profiles WHERE profile_name = ?",
+                                      (profile_name,)).fetchone()
+        return row[0] if row else None
+
+    def read_profile_state(self, profile_name):
+        with self._transaction("DEFERRED") as conn:  # One consistent read of snapshot and ops
+            row = conn.execute("SELECT version, data, journal_seq FROM profiles WHERE profile_name = ?",
+                               (profile_name,)).fetchone()
+            ops = conn.execute("SELECT seq, op FROM profile_ops WHERE profile_name = ? AND seq > ? ORDER BY seq",
+                               (profile_name, row[2] if row else 0)).fetchall()
+        if not row: return None, None, 0, []
+        try:
+            return row[0], json.loads(row[1]), row[2], [(seq, json.loads(op)) for seq, op in ops]
+        except json.JSONDecodeError:
+            return None, None, 0, []
+
+    def _last_journal_seq(self, conn, profile_name):
+        return conn.execute(
+            "SELECT MAX(COALESCE((SELECT MAX(seq) FROM profile_ops WHERE profile_name = ?), 0), "
+            "COALESCE((SELECT journal_seq FROM profiles WHERE profile_name = ?), 0))",
+            (profile_name, profile_name)).fetchone()[0]
+
+    def write_profile(self, profile_name, profile_data):
+        with self._transaction() as conn:
+            seq = self._last_journal_seq(conn, profile_name)
+            conn.execute("DELETE FROM profile_ops WHERE profile_name = ?", (profile_name,))
+            row = conn.execute("INSERT INTO profiles (profile_name, data, journal_seq) VALUES (?, ?, ?) "
+                               "ON CONFLICT(profile_name) DO UPDATE SET data = excluded.data, "
+                               "journal_seq = excluded.journal_seq, version = profiles.version + 1 "
+                               "RETURNING version",
+                               (profile_name, json.dumps(profile_data), seq)).fetchone()
+        return row[0]
+
+    def append_profile_op(self, profile_name, op):
+        with self._transaction() as conn:
+            if not conn.execute("SELECT 1 FROM profiles WHERE profile_name = ?", (profile_name,)).fetchone():
+                return None, None
+            seq = self._last_journal_seq(conn, profile_name) + 1
+            conn.execute("INSERT INTO profile_ops (profile_name, seq, op) VALUES (?, ?, ?)",
+                         (profile_name, seq, json.dumps(op)))
+            row = conn.execute("UPDATE profiles SET version = version + 1 WHERE profile_name = ? "
+                               "RETURNING version", (profile_name,)).fetchone()
+        return row[0], seq
+
+    def compact_profile_journal(self, profile_name, profile_data, seq):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM profile_ops WHERE profile_name = ? AND seq <= ?", (profile_name, seq))
+            row = conn.execute("UPDATE profiles SET data = ?, journal_seq = ?, version = version + 1 "
+                               "WHERE profile_name = ? RETURNING version",
+                               (json.dumps(profile_data), seq, profile_name)).fetchone()
+        return row[0] if row else None
+
+    # --- Resume Metadata ---
+    def list_resume_owners(self):
+        rows = self._connect().execute("SELECT DISTINCT profile_folder FROM resumes ORDER BY profile_folder").fetchall()
+        return [row[0] for row in rows]
+
+    def resume_metadata_version(self, profile_folder):
+        row = self._connect().execute("SELECT version FROM resume_versions WHERE profile_folder = ?",
+                                      (profile_folder,)).fetchone()
+        return row[0] if row else None
+
+    def _bump_resume_version(self, conn, profile_folder):
+        conn.execute("INSERT INTO resume_versions (profile_folder, version) VALUES (?, 1) "
+                     "ON CONFLICT(profile_folder) DO UPDATE SET version = resume_versions.version + 1",
+                     (profile_folder,))
+
+    def load_resume_metadata(self, profile_folder):
+        rows = self._connect().execute("SELECT data FROM resumes WHERE profile_folder = ? ORDER BY position",
+                                       (profile_folder,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def save_resume_metadata(self, profile_folder, metadata_list):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM resumes WHERE profile_folder = ?", (profile_folder,))
+            self._insert_resumes(conn, profile_folder, metadata_list, start=0)
+            self._bump_resume_version(conn, profile_folder)
+
+    def _insert_resumes(self, conn, profile_folder, entries, start):
+        conn.executemany(
+            "INSERT OR REPLACE INTO resumes (id, profile_folder, generation_date, position, data) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(entry['id'], profile_folder, entry.get('generation_date'), start + i, json.dumps(entry))
+             for i, entry in enumerate(entries)])
+
+    def add_resume_metadata(self, profile_folder, new_entries):
+        with self._transaction() as conn:
+            start = conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM resumes WHERE profile_folder = ?",
+                                 (profile_folder,)).fetchone()[0]
+            self._insert_resumes(conn, profile_folder, new_entries, start)
+            self._bump_resume_version(conn, profile_folder)
+
+    def update_resume_metadata(self, profile_folder, resume_id, changes):
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM resumes WHERE profile_folder = ? AND id = ?",
+                               (profile_folder, resume_id)).fetchone()
+            if not row: return None
+            entry = json.loads(row[0])
+            entry.update(changes)
+            conn.execute("UPDATE resumes SET data = ?, generation_date = ? WHERE id = ?",
+                         (json.dumps(entry), entry.get('generation_date'), resume_id))
+            self._bump_resume_version(conn, profile_folder)
+        return entry
+
+    def delete_resume_metadata(self, profile_folder, resume_id):
+        with self._transaction() as conn:
+            row = conn.execute("DELETE FROM resumes WHERE profile_folder = ? AND id = ? RETURNING data",
+                               (profile_folder, resume_id)).fetchone()
+            if row: self._bump_resume_version(conn, profile_folder)
+        return json.loads(row[0]) if row else None
+
+
+def create_storage(backend, password_file, profile_dir, resume_dir, db_path):
+    if backend == "json":
+        return JSONStorage(password_file, profile_dir, resume_dir)
+    if backend == "sqlite":
+        return SQLiteStorage(db_path)
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import create_storage  # noqa: E402
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, tmp_path):
+    """Each storage backend, in a fresh data directory."""
+    return create_storage(request.param, str(tmp_path / "passwords.json"), str(tmp_path / "profiles"),
+                          str(tmp_path / "resumes"), str(tmp_path / "resume_app.db"))
@@ -0,0 +1,117 @@
+import gc
+import os
+import sys
+import threading
+import multiprocessing
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import file_lock  # noqa: E402
+from file_lock import FileLock, lock_for, remove_lock_file, write_atomic  # noqa: E402
+from storage import JSONStorage  # noqa: E402
+
+# Forked workers stand in for the app's server processes
+fork = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+needs_fcntl = pytest.mark.skipif(file_lock.fcntl is None or fork is None,
+                                 reason="cross-process locking needs fcntl and fork")
+
+
+def run_in_other_thread(fn):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fn()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def try_lock(lock_path, results):
+    lock = FileLock(lock_path)
+    acquired = lock.acquire(blocking=False)
+    if acquired: lock.release()
+    results.put(acquired)
+
+
+def add_entries(root, worker, count):
+    storage = JSONStorage(os.path.join(root, "passwords.json"), os.path.join(root, "profiles"),
+                          os.path.join(root, "resumes"))
+    for i in range(count):
+        storage.add_resume_metadata("ada", [{"id": f"{worker}-{i}"}])
+        storage.create_user(f"user-{worker}-{i}", "hash")
+
+
+def test_lock_is_reentrant_and_excludes_other_threads(tmp_path):
+    lock = FileLock(str(tmp_path / "state.json.lock"))
+    with lock:
+        with lock:
+            assert not run_in_other_thread(lambda: lock.acquire(blocking=False))
+        assert not run_in_other_thread(lambda: lock.acquire(blocking=False))
+    assert run_in_other_thread(lambda: lock.acquire(blocking=False))
+
+
+@needs_fcntl
+def test_lock_excludes_other_processes(tmp_path):
+    lock_path = str(tmp_path / "state.json.lock")
+    results = fork.Queue()
+    with FileLock(lock_path):
+        worker = fork.Process(target=try_lock, args=(lock_path, results))
+        worker.start()
+        worker.join()
+        assert results.get(timeout=5) is False
+    worker = fork.Process(target=try_lock, args=(lock_path, results))
+    worker.start()
+    worker.join()
+    assert results.get(timeout=5) is True
+
+
+@needs_fcntl
+def test_concurrent_processes_do_not_lose_updates(tmp_path):
+    workers = [fork.Process(target=add_entries, args=(str(tmp_path), w, 20)) for w in range(4)]
+    for worker in workers: worker.start()
+    for worker in workers: worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+    storage = JSONStorage(str(tmp_path / "passwords.json"), str(tmp_path / "profiles"), str(tmp_path / "resumes"))
+    assert len(storage.load_resume_metadata("ada")) == 80
+    assert len(storage.load_passwords()) == 80
+
+
+def test_lock_for_shares_one_lock_and_forgets_unused_ones(tmp_path):
+    path = str(tmp_path / "resume.html")
+    lock = lock_for(path)
+    assert lock_for(path) is lock
+    lock_path = lock.path
+    del lock
+    gc.collect()
+    assert lock_path not in file_lock._locks
+
+
+def test_remove_lock_file(tmp_path):
+    path = str(tmp_path / "resume.html")
+    with lock_for(path):
+        assert os.path.exists(path + ".lock") or file_lock.fcntl is None
+        remove_lock_file(path)
+    assert not os.path.exists(path + ".lock")
+    remove_lock_file(path)  # Already gone
+
+
+def test_write_atomic_writes_text_and_bytes_without_leftovers(tmp_path):
+    path = tmp_path / "state.json"
+    write_atomic(str(path), "naïve")
+    assert path.read_text(encoding='utf-8') == "naïve"
+    write_atomic(str(path), b"\x00bytes")
+    assert path.read_bytes() == b"\x00bytes"
+    assert os.listdir(tmp_path) == ["state.json"]
+
+
+def test_failed_write_keeps_the_old_file(tmp_path, monkeypatch):
+    path = tmp_path / "state.json"
+    path.write_text("old", encoding='utf-8')
+
+    def fail(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        write_atomic(str(path), "new")
+    assert path.read_text(encoding='utf-8') == "old"
+    assert os.listdir(tmp_path) == ["state.json"]
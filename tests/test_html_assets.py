@@ -0,0 +1,54 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_assets import minify_html, write_html  # noqa: E402
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+
+
+def _resume_with_description(template_name, description):
+    with open(os.path.join(TEMPLATE_DIR, template_name), 'r', encoding='utf-8') as f:
+        template = f.read()
+    style = template[template.index("<style>"):template.index("</style>") + len("</style>")]
+    return (f"<!DOCTYPE html>\n<html>\n<head>\n    {style}\n</head>\n<body>\n"
+            f"    <section class=\"section\">\n        <h2>Work Experience</h2>\n"
+            f"        <div class=\"item\">\n            <p class=\"item-description\">{description}</p>\n"
+            f"        </div>\n    </section>\n</body>\n</html>\n")
+
+
+def test_multiline_item_description_keeps_its_line_breaks(tmp_path):
+    description = "• Led A\n• Built B\n• Shipped C"
+    for template_name in ("resume_template.html", "resume_slots.html"):
+        page = _resume_with_description(template_name, description)
+        path = tmp_path / "resume.html"
+        stored = write_html(str(path), page)
+        assert f'<p class="item-description">{description}</p>' in stored
+        assert path.read_text(encoding='utf-8') == stored
+
+
+def test_whitespace_between_blocks_is_still_removed():
+    minified = minify_html("<div>\n    <p>One  two</p>\n    <!-- note -->\n</div>\n")
+    assert minified == "<div><p>One two</p></div>"
+
+
+def test_inline_pre_wrap_style_is_preserved():
+    page = '<div><span style="white-space: pre-wrap">a\n  b</span></div>'
+    assert 'a\n  b' in minify_html(page)
+
+
+def test_nested_elements_inside_preserved_blocks_are_kept_whole():
+    style = "<style>.item-description { white-space: pre-wrap; }</style>"
+    page = (f"<html><head>{style}</head><body>\n"
+            '<div class="item-description">Intro\n  <div>inner\n   block</div>\n  tail\n   lines</div>\n'
+            "<pre>a\n  <pre>b\n  c</pre>\n  d\n</pre>\n"
+            "</body></html>")
+    minified = minify_html(page)
+    assert '<div class="item-description">Intro\n  <div>inner\n   block</div>\n  tail\n   lines</div>' in minified
+    assert "<pre>a\n  <pre>b\n  c</pre>\n  d\n</pre>" in minified
+
+
+def test_script_content_is_not_parsed_for_tags():
+    page = '<div>\n<script>var s = "<pre>  x";</script>\n  <p>a   b</p></div>'
+    assert minify_html(page) == '<div><script>var s = "<pre>  x";</script><p>a b</p></div>'
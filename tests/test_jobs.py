@@ -0,0 +1,71 @@
+import os
+import sys
+import json
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobs import JobQueue, QUEUED, RUNNING, SUCCEEDED, FAILED, ACTIVE_STATES  # noqa: E402
+
+
+def wait_until_finished(queue, job_dir, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_dir, job_id)
+        if job['state'] not in ACTIVE_STATES: return job
+        time.sleep(0.01)
+    raise TimeoutError(job_id)
+
+
+def test_job_records_move_to_succeeded_or_failed(tmp_path):
+    queue = JobQueue(max_workers=2)
+
+    def fail():
+        raise ValueError("model said no")
+
+    ok = queue.submit(str(tmp_path), lambda a, b: a + b, 2, 3, role="Engineer")
+    bad = queue.submit(str(tmp_path), fail)
+    assert ok['state'] == QUEUED and ok['role'] == "Engineer"
+    ok, bad = (wait_until_finished(queue, str(tmp_path), job['id']) for job in (ok, bad))
+    assert (ok['state'], ok['result']) == (SUCCEEDED, 5)
+    assert (bad['state'], bad['error']) == (FAILED, "model said no")
+
+
+def test_finished_jobs_are_reported_once(tmp_path):
+    queue = JobQueue(max_workers=1)
+    job = queue.submit(str(tmp_path), lambda: None)
+    wait_until_finished(queue, str(tmp_path), job['id'])
+    assert [j['id'] for j in queue.pop_finished(str(tmp_path))] == [job['id']]
+    assert queue.pop_finished(str(tmp_path)) == []
+
+
+def test_history_keeps_only_the_newest_finished_jobs(tmp_path):
+    queue = JobQueue(max_workers=1, max_history=3)
+    for i in range(6):
+        wait_until_finished(queue, str(tmp_path), queue.submit(str(tmp_path), lambda: None)['id'])
+    assert len(queue.list(str(tmp_path))) == 3
+
+
+def test_running_job_stays_active_for_other_processes_while_its_lease_is_renewed(tmp_path):
+    release = threading.Event()
+    owner = JobQueue(max_workers=1, heartbeat_interval=0.05, lease_seconds=0.3)
+    other_process = JobQueue(max_workers=1, heartbeat_interval=0.05, lease_seconds=0.3)
+    job = owner.submit(str(tmp_path), release.wait)
+    try:
+        time.sleep(0.8)  # Well past one lease
+        assert other_process.get(str(tmp_path), job['id'])['state'] == RUNNING
+    finally:
+        release.set()
+    assert wait_until_finished(other_process, str(tmp_path), job['id'])['state'] == SUCCEEDED
+
+
+def test_job_whose_lease_expired_is_failed(tmp_path):
+    # Written by a worker that has since died; a reused pid (here our own) must not keep it alive
+    stale = {"id": "stale", "state": RUNNING, "created": "2024-01-01 00:00:00", "finished": None,
+             "pid": os.getpid(), "heartbeat": time.time() - 120}
+    fresh = dict(stale, id="fresh", heartbeat=time.time())
+    with open(tmp_path / "jobs.json", 'w', encoding='utf-8') as f:
+        json.dump([stale, fresh], f)
+    states = {job['id']: job['state'] for job in JobQueue(lease_seconds=60).list(str(tmp_path))}
+    assert states == {"stale": FAILED, "fresh": RUNNING}
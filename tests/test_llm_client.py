@@ -0,0 +1,161 @@
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_client import (  # noqa: E402
+    LLMClient, RateLimiter, CircuitBreaker, MemoryBucketState, SQLiteBucketState,
+    ModelUnavailableError, ModelTimeoutError,
+)
+
+
+class QuotaError(Exception):
+    code = 429
+
+
+class BlockedError(Exception):
+    code = 400
+
+
+class Response:
+    text = "ok"
+
+
+class FakeModel:
+    """Raises the queued errors one call at a time, then answers."""
+
+    def __init__(self, errors=(), delay=0, chunks=("a", "b")):
+        self.errors = list(errors)
+        self.delay = delay
+        self.chunks = chunks
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.errors: raise self.errors.pop(0)
+        return iter(self.chunks) if stream else Response()
+
+
+def client_for(model, **kwargs):
+    kwargs.setdefault("backoff_base", 0)
+    return LLMClient(lambda: model, **kwargs)
+
+
+def test_quota_error_drains_every_configured_bucket():
+    for limits in ({"tokens_per_minute": 6000}, {"requests_per_minute": 60},
+                   {"requests_per_minute": 60, "tokens_per_minute": 6000}):
+        limiter = RateLimiter(MemoryBucketState(), **limits)
+        assert limiter.reserve(100) == 0
+        limiter.penalize()
+        assert limiter.reserve(100) > 0.5, limits
+
+
+def test_bucket_makes_callers_wait_once_the_capacity_is_spent():
+    limiter = RateLimiter(MemoryBucketState(), requests_per_minute=2)
+    assert limiter.reserve(0) == 0 and limiter.reserve(0) == 0
+    assert limiter.reserve(0) == pytest.approx(30, abs=0.1)  # One request refills every 30s
+    assert limiter.reserve(0) == pytest.approx(60, abs=0.1)  # Queued behind the previous caller
+
+
+def test_sqlite_buckets_are_shared_between_processes(tmp_path):
+    db_path = str(tmp_path / "buckets.db")
+    # Two states on one database stand in for two app workers
+    first = RateLimiter(SQLiteBucketState(db_path), tokens_per_minute=1000)
+    second = RateLimiter(SQLiteBucketState(db_path), tokens_per_minute=1000)
+    assert first.reserve(1000) == 0
+    assert second.reserve(500) == pytest.approx(30, abs=0.5)
+    first.penalize()
+    assert second.reserve(0) > 0
+
+
+def test_retryable_errors_are_retried_until_success():
+    limiter = RateLimiter(MemoryBucketState(), requests_per_minute=6000)
+    model = FakeModel(errors=[QuotaError("quota"), TimeoutError("slow")])
+    client = client_for(model, limiter=limiter)
+    assert client.generate("prompt").text == "ok"
+    stats = client.get_stats()
+    assert (model.calls, stats['retries'], stats['quota_errors'], stats['circuit_open']) == (3, 2, 1, 0)
+
+
+def test_retries_stop_after_max_retries():
+    model = FakeModel(errors=[QuotaError("quota")] * 5)
+    with pytest.raises(QuotaError):
+        client_for(model, max_retries=2).generate("prompt")
+    assert model.calls == 3
+
+
+def test_non_retryable_error_is_raised_straight_away():
+    model = FakeModel(errors=[BlockedError("blocked")])
+    client = client_for(model, breaker=CircuitBreaker(failure_threshold=1))
+    with pytest.raises(BlockedError):
+        client.generate("prompt")
+    assert model.calls == 1 and client.breaker.state == "closed"
+
+
+def test_slow_call_raises_model_timeout():
+    client = client_for(FakeModel(delay=0.5), timeout=0.05, max_retries=0)
+    with pytest.raises(ModelTimeoutError):
+        client.generate("prompt")
+    assert client.get_stats()['timeouts'] == 1
+
+
+def test_wait_longer_than_max_queue_seconds_fails_fast():
+    limiter = RateLimiter(MemoryBucketState(), requests_per_minute=1)
+    client = client_for(FakeModel(), limiter=limiter, max_queue_seconds=5)
+    client.generate("prompt")
+    with pytest.raises(ModelUnavailableError):
+        client.generate("prompt")
+    assert client.get_stats()['rejected'] == 1
+
+
+def test_circuit_opens_after_repeated_failures_and_closes_after_a_good_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+    model = FakeModel(errors=[ConnectionError("down")] * 2)
+    client = client_for(model, breaker=breaker, max_retries=1)
+    with pytest.raises(ConnectionError):
+        client.generate("prompt")
+    assert breaker.state == "open"
+    with pytest.raises(ModelUnavailableError):
+        client.generate("prompt")
+    assert model.calls == 2  # Rejected without calling the model
+
+    time.sleep(0.15)
+    breaker.before_call()  # The half-open trial...
+    assert breaker.state == "half_open"
+    with pytest.raises(ModelUnavailableError):
+        breaker.before_call()  # ...lets only one caller through
+    breaker.release()
+    assert client.generate("prompt").text == "ok"
+    assert breaker.state == "closed"
+
+
+def test_failed_trial_reopens_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.1)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(ModelUnavailableError):
+        breaker.before_call()
+
+
+def test_stream_retries_until_the_first_chunk():
+    model = FakeModel(errors=[QuotaError("quota")], chunks=("a", "b", "c"))
+    assert list(client_for(model).stream("prompt")) == ["a", "b", "c"]
+    assert model.calls == 2
+
+
+def test_concurrent_callers_share_one_limiter():
+    limiter = RateLimiter(MemoryBucketState(), requests_per_minute=60)
+    waits = []
+    threads = [threading.Thread(target=lambda: waits.append(limiter.reserve(0))) for _ in range(70)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert sum(1 for wait in waits if wait == 0) == 60
+    assert max(waits) == pytest.approx(10, abs=0.2)
@@ -0,0 +1,38 @@
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_renderer import PdfRenderer, pdf_path_for  # noqa: E402
+
+
+class _FakeHTML:
+    """Stands in for weasyprint.HTML (the real one needs Pango)."""
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def render(self):
+        return self
+
+    def write_pdf(self):
+        with open(self.filename, 'rb') as f:
+            return b"%PDF-fake " + f.read()
+
+
+def test_sidecar_is_written_before_the_render_resolves(tmp_path, monkeypatch):
+    # The pool forks after this, so the workers see the fake module too
+    monkeypatch.setitem(sys.modules, "weasyprint", types.SimpleNamespace(HTML=_FakeHTML))
+    html_path = tmp_path / "resume.html"
+    html_path.write_text("<html><body>Resume</body></html>", encoding='utf-8')
+    renderer = PdfRenderer(max_workers=1)
+
+    pdf_path, timings = renderer.render(str(html_path))
+    assert pdf_path == pdf_path_for(str(html_path))
+    assert os.path.exists(pdf_path + ".json")
+    assert "pdf_layout" in timings
+    assert renderer.cached_pdf(str(html_path)) == pdf_path  # An immediate second download reuses it
+
+    html_path.write_text("<html><body>Changed</body></html>", encoding='utf-8')
+    assert renderer.cached_pdf(str(html_path)) is None
@@ -0,0 +1,108 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profile_store import ProfileStore, apply_profile_op, normalize_profile, new_profile  # noqa: E402
+from storage import JSONStorage  # noqa: E402
+
+
+def experience(item_id, title="Engineer"):
+    return {"id": item_id, "title": title}
+
+
+def test_apply_profile_op_copies_instead_of_mutating():
+    profile = {"experiences": [experience("1")]}
+    updated, applied = apply_profile_op(profile, {"op": "add", "section": "experiences", "item": experience("2")})
+    assert applied and [e['id'] for e in updated['experiences']] == ["1", "2"]
+    assert profile == {"experiences": [experience("1")]}
+    same, applied = apply_profile_op(profile, {"op": "delete", "section": "experiences", "id": "missing"})
+    assert not applied and same is profile
+    with pytest.raises(ValueError):
+        apply_profile_op(profile, {"op": "rename", "section": "experiences"})
+
+
+def test_normalize_fills_defaults_and_reads_the_legacy_list():
+    assert normalize_profile([experience("1")])['experiences'] == [experience("1")]
+    profile = normalize_profile({"particulars": {"name": "Ada"}})
+    assert profile['particulars']['name'] == "Ada" and profile['particulars']['languages'] == []
+    assert profile['ai_custom_prompt'] == "" and profile['awards'] == []
+
+
+def test_item_edits_are_journaled_and_replayed_by_another_process(storage):
+    store = ProfileStore(storage, compact_after=1000)
+    store.save("ada", new_profile())
+    for i in range(3): store.add_item("ada", "experiences", experience(str(i)))
+    assert store.update_item("ada", "experiences", experience("1", "Lead"))
+    assert store.delete_item("ada", "experiences", "0")
+    assert not store.update_item("ada", "experiences", experience("missing"))
+    store.set_field("ada", "particulars", {"name": "Ada"})
+
+    assert len(storage.read_profile_state("ada")[3]) == 6  # Journaled, snapshot untouched
+    expected = [experience("1", "Lead"), experience("2")]
+    assert store.load("ada")['experiences'] == expected
+    replayed = ProfileStore(storage).load("ada")  # A fresh cache, as in another worker
+    assert replayed['experiences'] == expected and replayed['particulars']['name'] == "Ada"
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(storage):
+    store = ProfileStore(storage, compact_after=1000)
+    store.save("ada", new_profile())
+    for i in range(4): store.add_item("ada", "projects", {"id": str(i)})
+    before = store.load("ada")
+    store.compact("ada")
+    _, data, _, ops = storage.read_profile_state("ada")
+    assert ops == [] and data['projects'] == before['projects']
+    store.add_item("ada", "projects", {"id": "4"})
+    assert [p['id'] for p in ProfileStore(storage).load("ada")['projects']] == ["0", "1", "2", "3", "4"]
+
+
+def test_compaction_runs_in_the_background_after_enough_ops(storage):
+    store = ProfileStore(storage, compact_after=3)
+    store.save("ada", new_profile())
+    for i in range(3): store.add_item("ada", "awards", {"id": str(i)})
+    store._compactor.shutdown(wait=True)
+    assert storage.read_profile_state("ada")[3] == []
+    assert len(ProfileStore(storage).load("ada")['awards']) == 3
+
+
+def test_crash_between_snapshot_and_journal_trim_does_not_replay_ops(tmp_path):
+    storage = JSONStorage(str(tmp_path / "passwords.json"), str(tmp_path / "profiles"), str(tmp_path / "resumes"))
+    store = ProfileStore(storage, compact_after=1000)
+    store.save("ada", new_profile())
+    for i in range(2): store.add_item("ada", "experiences", experience(str(i)))
+    _, data, _, ops = storage.read_profile_state("ada")
+    # The snapshot now contains both ops, but the journal still lists them (trim never happened)
+    storage._write_snapshot("ada", store.load("ada"), ops[-1][0])
+    assert [e['id'] for e in ProfileStore(storage).load("ada")['experiences']] == ["0", "1"]
+
+
+def test_failed_append_leaves_the_cache_as_it_was(storage):
+    store = ProfileStore(storage, compact_after=1000)
+    store.save("ada", new_profile())
+    for i in range(3): store.add_item("ada", "experiences", experience(str(i)))
+    store.update_item("ada", "experiences", experience("1", "Lead"))  # Builds the id -> index lookup
+    positions = {section: dict(index) for section, index in store._cache["ada"].positions.items()}
+
+    def disk_full(*args):
+        raise OSError("No space left on device")
+    original, storage.append_profile_op = storage.append_profile_op, disk_full
+    for edit in (lambda: store.add_item("ada", "experiences", experience("9")),
+                 lambda: store.delete_item("ada", "experiences", "0")):
+        with pytest.raises(OSError):
+            edit()
+    storage.append_profile_op = original
+    assert store._cache["ada"].positions == positions
+    assert store.update_item("ada", "experiences", experience("2", "Staff"))
+    assert [e['title'] for e in store.load("ada")['experiences']] == ["Engineer", "Lead", "Staff"]
+
+
+def test_invalid_names_are_rejected(storage):
+    store = ProfileStore(storage)
+    assert store.load("../etc") == new_profile()
+    with pytest.raises(ValueError):
+        store.save("../etc", new_profile())
+    with pytest.raises(ValueError):
+        store.add_item("ada", "hobbies", {"id": "1"})
@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resume_cache import ResumeCache, make_cache_key  # noqa: E402
+
+
+def test_key_depends_on_prompt_model_and_settings():
+    key = make_cache_key("prompt", "model", {"temperature": 0.2})
+    assert key == make_cache_key("prompt", "model", {"temperature": 0.2})
+    assert key != make_cache_key("prompt 2", "model", {"temperature": 0.2})
+    assert key != make_cache_key("prompt", "model 2", {"temperature": 0.2})
+    assert key != make_cache_key("prompt", "model", {"temperature": 0.3})
+
+
+def test_entries_survive_a_new_process_through_the_disk_tier(tmp_path):
+    ResumeCache(str(tmp_path)).put("k", "<html>page</html>")
+    cache = ResumeCache(str(tmp_path))
+    assert cache.get("k") == "<html>page</html>"
+    assert cache.get("k") == "<html>page</html>"
+    assert cache.get("missing") is None
+    stats = cache.get_stats()
+    assert (stats['disk_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 1)
+
+
+def test_html_and_json_entries_never_mix(tmp_path):
+    cache = ResumeCache(str(tmp_path))
+    cache.put("same-key", '{"summary": "text"}', kind="json")
+    assert cache.get("same-key") is None
+    assert cache.get("same-key", kind="json") == '{"summary": "text"}'
+    assert sorted(os.listdir(tmp_path)) == ["same-key.json"]
+    assert ResumeCache(str(tmp_path)).get("same-key") is None  # Not from disk either
+
+
+def test_disk_tier_evicts_oldest_entries(tmp_path):
+    cache = ResumeCache(str(tmp_path), max_disk_bytes=250)
+    for i in range(5):
+        cache.put(f"k{i}", "x" * 100)
+        os.utime(tmp_path / f"k{i}.html", (i, i))  # Distinct mtimes, oldest first
+    assert sorted(os.listdir(tmp_path)) == ["k3.html", "k4.html"]
+    assert cache.get_stats()['evictions'] == 3
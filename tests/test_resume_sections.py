@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resume_sections import find_section, replace_in_section  # noqa: E402
+
+RESUME = """<html><body>
+<header class="resume-header"><h1>Jane Doe</h1></header>
+<section class="section">
+    <h2>Professional Summary</h2>
+    <p class="item-description">Backend Engineer ready to bring payments experience to Acme.</p>
+</section>
+<section class="section">
+    <h2>Work Experience</h2>
+    <div class="item">
+        <div class="item-header"><h3>Backend Engineer</h3></div>
+        <div class="item-subheader">Acme</div>
+    </div>
+</section>
+</body></html>"""
+
+
+def test_replacements_stay_inside_the_summary():
+    adapted = replace_in_section(RESUME, "summary", [("Acme", "Globex"), ("Backend Engineer", "Platform Engineer")])
+    summary = adapted[slice(*find_section(adapted, "summary"))]
+    experience = adapted[slice(*find_section(adapted, "experiences"))]
+    assert "Platform Engineer ready to bring payments experience to Globex." in summary
+    # The candidate really worked at Acme as a Backend Engineer: that entry must not change
+    assert "<h3>Backend Engineer</h3>" in experience
+    assert '<div class="item-subheader">Acme</div>' in experience
+    assert "Globex" not in experience
+
+
+def test_page_without_the_section_is_unchanged():
+    page = "<html><body><p>Acme</p></body></html>"
+    assert replace_in_section(page, "summary", [("Acme", "Globex")]) == page
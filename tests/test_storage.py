@@ -0,0 +1,84 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import JSONStorage, SQLiteStorage  # noqa: E402
+
+
+def entry(resume_id, **fields):
+    return dict({"id": resume_id, "filename": f"{resume_id}.html", "company": "Acme", "role": "Engineer",
+                 "generation_date": "2024-01-01 00:00:00"}, **fields)
+
+
+def test_create_user_only_adds_free_names(storage):
+    assert storage.get_password_hash("ada") is None
+    assert storage.create_user("ada", "hash-1")
+    assert not storage.create_user("ada", "hash-2")
+    assert storage.get_password_hash("ada") == "hash-1"
+    storage.set_password_hash("ada", "hash-3")  # Password change
+    assert storage.load_passwords() == {"ada": "hash-3"}
+
+
+def test_profile_snapshot_and_journal_round_trip(storage):
+    assert storage.read_profile_state("ada") == (None, None, 0, [])
+    assert storage.append_profile_op("ada", {"op": "set", "field": "ai_custom_prompt", "value": "x"}) == (None, None)
+
+    version = storage.write_profile("ada", {"experiences": []})
+    assert storage.profile_version("ada") == version
+    ops = [{"op": "add", "section": "experiences", "item": {"id": str(i)}} for i in range(3)]
+    seqs = []
+    for op in ops:
+        new_version, seq = storage.append_profile_op("ada", op)
+        assert new_version != version
+        version = new_version
+        seqs.append(seq)
+    assert seqs == sorted(seqs) and len(set(seqs)) == 3
+
+    _, data, snapshot_seq, journal = storage.read_profile_state("ada")
+    assert data == {"experiences": []}
+    assert [op for _, op in journal] == ops
+
+    storage.compact_profile_journal("ada", {"experiences": [{"id": "0"}, {"id": "1"}]}, seqs[1])
+    _, data, snapshot_seq, journal = storage.read_profile_state("ada")
+    assert (data, snapshot_seq) == ({"experiences": [{"id": "0"}, {"id": "1"}]}, seqs[1])
+    assert journal == [(seqs[2], ops[2])]
+    assert storage.append_profile_op("ada", ops[0])[1] == seqs[2] + 1  # Seqs keep counting after compaction
+
+
+def test_resume_metadata_add_update_delete(storage):
+    assert storage.load_resume_metadata("ada") == []
+    assert storage.resume_metadata_version("ada") is None
+    storage.add_resume_metadata("ada", [entry("a"), entry("b")])
+    storage.add_resume_metadata("ada", [entry("c")])
+    version = storage.resume_metadata_version("ada")
+    assert [e['id'] for e in storage.load_resume_metadata("ada")] == ["a", "b", "c"]
+    assert storage.list_resume_owners() == ["ada"]
+
+    assert storage.update_resume_metadata("ada", "b", {"role": "Lead"})['role'] == "Lead"
+    assert storage.update_resume_metadata("ada", "missing", {"role": "Lead"}) is None
+    assert storage.resume_metadata_version("ada") != version
+
+    assert storage.delete_resume_metadata("ada", "a")['id'] == "a"
+    assert storage.delete_resume_metadata("ada", "a") is None
+    assert [(e['id'], e['role']) for e in storage.load_resume_metadata("ada")] == [("b", "Lead"), ("c", "Engineer")]
+
+
+def test_json_journal_skips_a_torn_last_line(tmp_path):
+    storage = JSONStorage(str(tmp_path / "passwords.json"), str(tmp_path / "profiles"), str(tmp_path / "resumes"))
+    storage.write_profile("ada", {"experiences": []})
+    op = {"op": "add", "section": "experiences", "item": {"id": "1"}}
+    storage.append_profile_op("ada", op)
+    with open(tmp_path / "profiles" / "ada.journal", 'a', encoding='utf-8') as f:
+        f.write('{"seq": 2, "op": {"op": "add"')  # Crash mid-append
+    assert [o for _, o in storage.read_profile_state("ada")[3]] == [op]
+
+
+def test_sqlite_is_shared_by_separate_connections(tmp_path):
+    first, second = SQLiteStorage(str(tmp_path / "app.db")), SQLiteStorage(str(tmp_path / "app.db"))
+    first.write_profile("ada", {"experiences": []})
+    assert second.create_user("ada", "hash")
+    assert not first.create_user("ada", "other")
+    second.add_resume_metadata("ada", [entry("a")])
+    assert [e['id'] for e in first.load_resume_metadata("ada")] == ["a"]
+    assert first.profile_version("ada") == second.profile_version("ada")
@@ -0,0 +1,68 @@
+import os
+import time
+import zipfile
+
+CHUNK_SIZE = 64 * 1024
+# Already-compressed formats are stored as-is; deflating them again only costs CPU
+STORED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg"}
+
+
+class _StreamSink:
+    """Write-only, unseekable file object that zipfile writes into. The
+    generator below drains it after every write, so it only ever holds the
+    bytes of one chunk."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class StreamingZip:
+    """Builds a ZIP archive incrementally. Each add_* method is a generator
+    yielding the archive bytes produced so far, and close() yields the
+    central directory. Nothing is kept between members except the small
+    per-member directory records zipfile needs at the end."""
+
+    def __init__(self):
+        self._sink = _StreamSink()
+        # An unseekable target makes zipfile write sizes in data descriptors
+        self._zip = zipfile.ZipFile(self._sink, mode='w')
+
+    def _member_info(self, arcname, mtime):
+        info = zipfile.ZipInfo(arcname, date_time=time.localtime(mtime)[:6])
+        stored = os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS
+        info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        return info
+
+    def add_file(self, path, arcname):
+        info = self._member_info(arcname, os.path.getmtime(path))
+        info.file_size = os.path.getsize(path)  # Lets zipfile decide on zip64 up front
+        with open(path, 'rb') as src, self._zip.open(info, mode='w') as dest:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                dest.write(chunk)
+                data = self._sink.drain()
+                if data: yield data
+        data = self._sink.drain()
+        if data: yield data
+
+    def add_bytes(self, data, arcname):
+        self._zip.writestr(self._member_info(arcname, time.time()), data)
+        data = self._sink.drain()
+        if data: yield data
+
+    def close(self):
+        self._zip.close()
+        data = self._sink.drain()
+        if data: yield data